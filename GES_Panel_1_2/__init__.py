@@ -0,0 +1,1454 @@
+#    Copyright (c) 2021 imagiscope
+
+#    Permission is hereby granted, free of charge, to any person obtaining a copy
+#    of this software and associated documentation files (the "Software"), to deal
+#    in the Software without restriction, including without limitation the rights
+#    to use the Software, and to permit persons to whom the Software is
+#    furnished to do so, subject to the following conditions:
+
+#    1. Not for resale (use of software tools for revenue generation excluded).
+#    2. Credit to: "https://www.youtube.com/c/ImagiscopeTech"
+#    3. Notification of commercial use to author.
+
+#    The above copyright notice and this permission notice shall be included in all
+#    copies or substantial portions of the Software.
+
+#    THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+#    IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+#    FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+#    AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+#    LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+#    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+#    SOFTWARE.
+
+bl_info = {
+    "name": "Earth Studio",
+    "author": "Rob Jolly - Imagiscope",
+    "description": "Earth Studio Tools Addon",
+    "blender": (2, 80, 0),
+    "version": (1, 2, 2),
+    "location": "View3D",
+    "warning": "",
+    "category": "Import-Export"
+}
+
+import bpy, json, mathutils, math, bmesh, os, importlib, logging, time
+from mathutils import *
+from bpy.props import EnumProperty
+from bpy.app.handlers import persistent
+import numpy
+
+# bpy-free parsing and geo maths (ges_core.py in this package)
+if "ges_core" in locals(): # "Reload Scripts" picks up core changes too
+    importlib.reload(ges_core)
+else:
+    from . import ges_core
+from .ges_core import (cachedgessteps, cachedroutesteps, cachedallroutesteps, cachedindex, cache, runsteps, progresssteps, maskranges, gestrackpoints, gescamera, decimatecamera, routesplines,
+    vertexlla, llastrings, kmlheader, kmlfooter, writepolygonsteps, openkml, Profile, log)
+
+lastprofile = None # timings of the last import/export, shown in the Help panel
+
+# Scene registry - the GES world, its trackpoints and marker template candidates
+# scanned once after the scene changes, so panel draws and enum callbacks don't walk every object
+class GESRegistry:
+    def __init__(self):
+        self.valid = False
+        self.scene = 0
+        self.count = -1
+        self.world = None # name of _GES_WORLD when it is in the scene
+        self.tracks = [] # v_snapto items
+        self.templates = [] # v_mtemplate items
+
+    def invalidate(self, *args):
+        self.valid = False
+
+    def get(self, scene=None):
+        scene = scene or bpy.context.scene
+        # object count also catches additions/removals made before a depsgraph update (ie. in background mode)
+        if not self.valid or self.scene != scene.as_pointer() or self.count != len(bpy.data.objects):
+            self.rebuild(scene)
+        return self
+
+    def rebuild(self, scene):
+        self.scene = scene.as_pointer()
+        self.count = len(bpy.data.objects)
+        self.tracks = []
+        self.templates = []
+        wobj = scene.objects.get("_GES_WORLD")
+        self.world = wobj.name if wobj else None
+        # trackpoints in the order of _GES_WORLD.children (by name, as before) - v_snapto is saved as
+        # the index into this list, so it must not follow the scene link order
+        for obj in (wobj.children if wobj else ()):
+            if obj.type == "MESH" and obj.data.name[0:4] == "Plan": #mod for some international languages
+                self.tracks.append(( obj.name, obj.name,""))
+        for obj in scene.objects:
+            # Only display root obects - no cameras, no lights, no GES items
+            if obj.parent == None and obj.type != 'LIGHT' and obj.type != 'CAMERA':
+                if obj.name[0:5] != "_GES_" and obj.name[0:7] != "Marker_":
+                    self.templates.append(( obj.name, obj.name,""))
+        self.valid = True
+
+registry = GESRegistry()
+
+# invalidate the registry when objects are added, removed or moved between collections
+@persistent
+def gesdepsgraph(scene, depsgraph):
+    if registry.count != len(bpy.data.objects) or any(isinstance(u.id, bpy.types.Collection) for u in depsgraph.updates):
+        registry.invalidate()
+
+# ...or renamed/re-parented (not always a depsgraph update)
+msgowner = object()
+def gessubscribe():
+    bpy.msgbus.clear_by_owner(msgowner)
+    for key in ((bpy.types.Object, "name"), (bpy.types.Object, "parent")):
+        bpy.msgbus.subscribe_rna(key=key, owner=msgowner, args=(), notify=registry.invalidate)
+
+# subscriptions are dropped with the old file - subscribe again after loading
+@persistent
+def gesloadpost(dummy):
+    global activejob
+    activejob = None # a job's modal handler doesn't survive loading a file
+    registry.invalidate()
+    gessubscribe()
+
+@persistent
+def gesundo(dummy):
+    registry.invalidate()
+ 
+                
+class GES_OT_Path(bpy.types.PropertyGroup):
+    p_data: bpy.props.StringProperty(name="0000",subtype='FILE_PATH',default=r"")
+    p_movie: bpy.props.StringProperty(name="data",subtype='FILE_PATH',default=r"")
+    p_kml: bpy.props.StringProperty(name="kml",subtype='FILE_PATH',default=r"", description="Route file - .kml, .gpx or .geojson")
+    p_refdata: bpy.props.StringProperty(name="refdata",subtype='FILE_PATH',default=r"")
+    
+    p_objexpfolder: bpy.props.StringProperty(name="expdata",subtype='DIR_PATH',default=r"//")
+    p_objexp: bpy.props.StringProperty(name="expdata",subtype='FILE_NAME',default=r"ObjectKML")
+    
+    v_curve: bpy.props.EnumProperty(name="Curve",items=[('NURBS',"Nurbs",""),('POLY',"Poly","")])
+    v_routes: bpy.props.EnumProperty(name="Routes",items=[('FIRST',"First Route","Only the first LineString (or the joined gx:Track points)"),
+        ('SPLINES',"All - One Curve","Every LineString/gx:Track as a spline of one RoutePath curve"),
+        ('OBJECTS',"All - Per Placemark","One curve object per Placemark, named after it")])
+    v_reimport: bpy.props.BoolProperty(name="Re-import into Selected Route",description="Rebuild the points of the selected RoutePath in place - keeps its parent, anchor, materials, modifiers and animation.", default = False) 
+    
+    v_update: bpy.props.BoolProperty(name="Update Existing Import",description="Reuse the camera, footage and trackpoints of the earlier import - only changed trackpoints and camera keys are written.", default = False) 
+    v_decimate: bpy.props.BoolProperty(name="Decimate Keyframes",description="Only keep the camera keyframes that linear interpolation can't reproduce within the tolerances.", default = False) 
+    v_postol: bpy.props.FloatProperty(name="Position Tolerance (m)", default=0.05, min=0, max=100, 
+        description="Largest camera position error allowed between kept keyframes" )
+    v_rottol: bpy.props.FloatProperty(name="Rotation Tolerance (°)", default=0.01, min=0, max=10, 
+        description="Largest camera rotation error allowed between kept keyframes" )
+    
+    def trackitems(self,context):
+        return registry.get(context.scene if context else None).tracks
+    v_snapto: bpy.props.EnumProperty(
+        name = "Snap to",
+        description = "Snap to TrackPoint in _GES_WORLD",
+        items =  trackitems 
+    )
+    
+    v_terrain: bpy.props.BoolProperty(name="Follow Terrain",description="Align the KML route with supplied JSON TrackPoints.", default = True) 
+    
+    v_elevation: bpy.props.IntProperty(name="Add Elevation (m)", default=0, min=-100, max=10000, 
+        description="Add elevation to Route (0 is none, 1000 = 1km, 100000 = 10km)" )
+        
+    v_reduce: bpy.props.IntProperty(name="Point Reduction", default=2, min=0, max=100, 
+        description="Reduce KML points based on clustering (1 is less reduction, 100 is more reduction)" )
+    v_reducemode: bpy.props.EnumProperty(name="Reduction",items=[('CLUSTER',"Clustering","Keep a point once it moved Point Reduction meters on both x and y"),
+        ('SIMPLIFY',"Simplify (Douglas-Peucker)","Drop points closer than the tolerance to the simplified route")])
+    v_tolerance: bpy.props.FloatProperty(name="Tolerance (m)", default=1.0, min=0, max=1000, 
+        description="Largest distance from a dropped point to the simplified route (0 keeps every point)" )
+    v_prox: bpy.props.IntProperty(name="Match Proximity (m)", default=1, min=1, max=1000,
+        description="Set altitude based on meters (approx) to trackpoint (1 is closer, 100 more forgiving)")
+    
+    v_bevel: bpy.props.FloatProperty(name="Bevel Depth", default=0, min=0, max=5, 
+        description="Starting Route Bevel (0 = none)" )
+    
+    v_objlinecolor: bpy.props.FloatVectorProperty(name="Line Color", subtype='COLOR', default=[0.0,1.0,0.0])
+    v_objfillcolor: bpy.props.FloatVectorProperty(name="Fill Color", subtype='COLOR', default=[1.0,1.0,1.0])
+    
+    v_objlinewidth: bpy.props.IntProperty(name="Line Width", default=0, min=0, max=50, 
+        description="Width of line (0 = none)" )
+        
+   
+    v_objfillopacity: bpy.props.IntProperty(name="Fill Opacity", default=100, min=1, max=100)
+    v_objkmz: bpy.props.BoolProperty(name="Save as KMZ",description="Write a compressed .kmz instead of a .kml file.", default = False) 
+    
+    def nontrackitems(self,context):
+        return registry.get(context.scene if context else None).templates
+    v_mtemplate: bpy.props.EnumProperty(
+        name = "Template",
+        description = "Marker Template",
+        items =  nontrackitems 
+    )
+    v_mlookat: bpy.props.BoolProperty(name="Face to Camera",description="Align the Marker to the Camera.", default = True) 
+    v_minstance: bpy.props.BoolProperty(name="Share Template Data",description="Markers link the template's mesh/curve data instead of copying it (text is still unique per marker).", default = False) 
+
+    def setloglevel(self,context):
+        log.setLevel(self.v_loglevel)
+    v_loglevel: bpy.props.EnumProperty(
+        name = "Log Level",
+        description = "Console output of the import/export steps",
+        items = [('ERROR',"Error",""),('WARNING',"Warning",""),('INFO',"Info",""),('DEBUG',"Debug","")],
+        default = 'WARNING',
+        update = setloglevel
+    )
+    def setcachebudget(self,context):
+        cache.resize(self.v_cachemb << 20)
+    v_cachemb: bpy.props.IntProperty(name="Cache Budget (MB)", default=256, min=0, max=65536, update=setcachebudget,
+        description="Memory for parsed JSON/KML files kept between imports (0 = no cache)" )
+    v_sidecar: bpy.props.BoolProperty(name="Binary Sidecar",description="Save decoded Earth Studio JSON next to it (.gescache folder) and load that on later imports.", default = False) 
+    v_profile: bpy.props.BoolProperty(name="Save Profile",description="Write the phase timings to a .ges_profile.json file next to the .blend file.", default = False) 
+
+    
+# Earth Studio import panel
+class GES_PT_ImportPanel(bpy.types.Panel):
+    bl_label = "Earth Studio Import"
+    bl_idname = "GES_PT_ImportPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Earth Studio'
+    
+    def draw(self,context):
+        layout = self.layout
+        row = layout.row()
+        row.label(text="Footage (mp4 or first jpeg):")
+        row = layout.row()
+        row.prop(bpy.context.scene.GES_OT_Path, "p_movie", text="",icon="IMAGE_DATA")
+        row = layout.row()
+        row.label(text="Earth Studio JSON File:")
+        row = layout.row()
+        row.prop(bpy.context.scene.GES_OT_Path, "p_data", text="",icon="VIEW_CAMERA")
+        row = layout.row()
+        row.prop(bpy.context.scene.GES_OT_Path, "v_decimate")
+        if bpy.context.scene.GES_OT_Path.v_decimate:
+            row = layout.box()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_postol")
+            row.prop(bpy.context.scene.GES_OT_Path, "v_rottol")
+        update = False
+        if registry.get(context.scene).world:
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_update")
+            update = bpy.context.scene.GES_OT_Path.v_update
+        row = layout.row()
+        fa = bpy.context.scene.GES_OT_Path.p_movie
+        fb  = bpy.context.scene.GES_OT_Path.p_data
+        if fa != '' and fb != '': # ensure both selections have 'text' (simple validation)
+            row.operator("scene.pre_ges", text="Update Earth Studio Import" if update else "Import Earth Studio" )
+        if fa == '' or fb == '':
+            row.operator("scene.is_void", text="Select Files" , icon="LOCKED")
+
+
+# Object to KML panel             
+class GES_PT_ObjectKMLPanel(bpy.types.Panel):
+    bl_label = "Export Object as KML"
+    bl_idname = "GES_PT_ObjectKMLPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI' 
+    bl_category = 'Earth Studio'
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw(self,context):
+        hasGES = 1 if registry.get(context.scene).world else 0
+        
+        if hasGES == 1:
+            selobj = bpy.context.active_object
+           
+            if selobj:
+                
+                if selobj.type == "MESH" or selobj.type == "CURVE":
+                    layout = self.layout
+                    
+                    row = layout.row()
+                    
+                    row.label(text="Selected: " + selobj.name)
+                    if selobj.type == "CURVE":
+                        row = layout.row()
+                        row.label(text="- Curve Optimized")    
+                    row = layout.box()
+                    row.prop(bpy.context.scene.GES_OT_Path, "v_objfillcolor")
+                    row.prop(bpy.context.scene.GES_OT_Path, "v_objfillopacity")
+                    row = layout.box()
+                    row.prop(bpy.context.scene.GES_OT_Path, "v_objlinecolor")
+                    row.prop(bpy.context.scene.GES_OT_Path, "v_objlinewidth")
+                    row = layout.row()
+                    row.label(text="Destination Folder:")
+                    row = layout.row()
+                    row.prop(bpy.context.scene.GES_OT_Path, "p_objexpfolder", text="")
+                    row = layout.row()
+                    row.label(text="Filename:" )
+                    row = layout.row()
+                    row.prop(bpy.context.scene.GES_OT_Path, "p_objexp", text="")
+                    row = layout.row()
+                    row.prop(bpy.context.scene.GES_OT_Path, "v_objkmz")
+                    row = layout.row()
+                    row.operator("scene.pre_objkml", text="Export Object as KML" ).action = "pri"
+                else:
+                    layout = self.layout
+               
+                    row = layout.row()
+                    row.label(text="Invalid: Mesh or Curve Only")
+                    row = layout.row()
+                    row.label(text="Try Converting to Mesh")
+            else:
+                layout = self.layout
+                row = layout.row()
+                row.label(text="Select Object", icon="LOCKED")
+                row = layout.row()   
+           
+        if hasGES == 0: # 'disable' section if there is no imported project
+            layout = self.layout
+            row = layout.row()
+            row.label(text="Import Earth Studio first", icon="LOCKED")
+            row = layout.row()      
+       
+    
+# KML import panel               
+class GES_PT_KMLPanel(bpy.types.Panel):
+    bl_label = "Import KML Route" # Import/Export"
+    bl_idname = "GES_PT_KMLPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI' 
+    bl_category = 'Earth Studio'
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw(self,context):
+        hasGES = 1 if registry.get(context.scene).world else 0
+                
+        if hasGES == 1: # enabled
+            layout = self.layout
+            row = layout.row()
+            row.label(text="Route File (KML, GPX, GeoJSON):")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "p_kml", text="", icon="WORLD")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_routes")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_snapto")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_curve")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_bevel")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_elevation")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_terrain")
+            if str(bpy.context.scene.GES_OT_Path.v_terrain) == "True":
+                row = layout.box()
+                row.label(text="Reference JSON File:")
+                row.prop(bpy.context.scene.GES_OT_Path, "p_refdata", text="", icon="LIBRARY_DATA_DIRECT")
+                row.prop(bpy.context.scene.GES_OT_Path, "v_prox")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_reducemode")
+            row = layout.row()
+            if bpy.context.scene.GES_OT_Path.v_reducemode == 'SIMPLIFY':
+                row.prop(bpy.context.scene.GES_OT_Path, "v_tolerance")
+            else:
+                row.prop(bpy.context.scene.GES_OT_Path, "v_reduce")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_reimport")
+            row = layout.row()
+            
+            fa = bpy.context.scene.GES_OT_Path.p_kml
+            fb  = bpy.context.scene.GES_OT_Path.p_refdata
+            target = routetarget()
+            if fa != '' and bpy.context.scene.GES_OT_Path.v_reimport: #(simple validation)
+                row.enabled = target is not None
+                row.operator("scene.pre_kml", text="Re-import into " + (target.name if target else "Selected Route")).action = "pri"
+            elif fa != '':
+                row.operator("scene.pre_kml", text="Import KML Route" ).action = "pri"
+               
+            if fa == '':
+                row.operator("scene.is_void", text="Select Files" , icon="LOCKED")
+        if hasGES == 0: # 'disable' section if there is no imported project
+            layout = self.layout
+            row = layout.row()
+            row.label(text="Import Earth Studio first", icon="LOCKED")
+            row = layout.row()
+                  
+# Marker Panel
+class GES_PT_MarkerPanel(bpy.types.Panel):
+    bl_label = "Trackpoint Marker Tool"
+    bl_idname = "GES_PT_MarkerPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI'
+    bl_category = 'Earth Studio'
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw(self,context):
+        hasGES = 1 if registry.get(context.scene).world else 0
+           
+                    
+        if hasGES == 1: # enabled
+            layout = self.layout
+            row = layout.row()
+            row.label(text="Add Marker for each Trackpoint")
+            row = layout.row()
+            row.label(text="1. Create Template Marker")
+            row = layout.row()
+            row.label(text="   - Parent all objects to object/empty")
+            row = layout.row()
+            row.label(text="   - Text Object will use Trackpoint name")
+            row = layout.row()
+            row.label(text="   - Origin of Parent is rotation point")
+            row = layout.row()
+            row.label(text="2. Select Template Marker")
+            row = layout.row()
+            row.label(text="3. Use 'Face..' to always point to Camera")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_mtemplate")
+            
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_mlookat")
+            row = layout.row()
+            row.prop(bpy.context.scene.GES_OT_Path, "v_minstance")
+           
+            row = layout.row()
+            
+           
+            row.operator("scene.pre_marker", text="Create Markers" )
+               
+           
+        if hasGES == 0: # 'disable' section if there is no imported project
+            layout = self.layout
+            row = layout.row()
+            row.label(text="Import Earth Studio first", icon="LOCKED")
+            row = layout.row()
+            
+# Help Panel
+class GES_PT_InfoPanel(bpy.types.Panel):
+    bl_label = "Help"
+    bl_idname = "GES_PT_InfoPanel"
+    bl_space_type = 'VIEW_3D'
+    bl_region_type = 'UI' 
+    bl_category = 'Earth Studio'
+    bl_options = {'DEFAULT_CLOSED'}
+    
+    def draw(self,context):
+        layout = self.layout
+       
+        row = layout.row()
+        row.label(text="Tutorials")
+        row = layout.row()
+        op = row.operator('wm.url_open', text="View on YouTube")
+        op.url = "https://www.youtube.com/c/ImagiscopeTech"
+       
+        row = layout.row()
+        row.label(text="Diagnostics")
+        row = layout.row()
+        row.prop(bpy.context.scene.GES_OT_Path, "v_loglevel")
+        row = layout.row()
+        row.prop(bpy.context.scene.GES_OT_Path, "v_profile")
+        row = layout.row()
+        row.prop(bpy.context.scene.GES_OT_Path, "v_cachemb")
+        row = layout.row()
+        row.prop(bpy.context.scene.GES_OT_Path, "v_sidecar")
+        cs = cache.stats()
+        row = layout.row()
+        row.label(text="Cache: " + str(cs["entries"]) + " files, " + format(cs["bytes"] / 1048576, ".1f") + " MB, "
+            + str(cs["hits"]) + " hits / " + str(cs["misses"]) + " misses")
+        row = layout.row()
+        row.operator("scene.ges_clearcache", text="Clear Cache")
+        if lastprofile:
+            row = layout.box()
+            for line in lastprofile.summary():
+                row.label(text=line)
+
+# Void class - returns nothing
+class isvoid(bpy.types.Operator):
+    bl_idname = "scene.is_void"
+    bl_label = "GES is void"
+    
+    def execute(self, context): 
+        return {'FINISHED'}
+
+# drop cached JSON/KML files
+class clearcache(bpy.types.Operator):
+    bl_idname = "scene.ges_clearcache"
+    bl_label = "GES Clear Cache"
+    
+    def execute(self, context): 
+        cache.clear()
+        return {'FINISHED'}
+
+# datablock types the imports/exports create - snapshot before, remove whatever is new on cancel
+rollbacktypes = ("objects", "meshes", "curves", "cameras", "actions", "movieclips")
+
+def snapshot():
+    return {k: set(getattr(bpy.data, k).keys()) for k in rollbacktypes}
+
+def rollback(before):
+    for k in rollbacktypes: # objects first, then their data
+        coll = getattr(bpy.data, k)
+        for name in [n for n in coll.keys() if n not in before[k]]:
+            coll.remove(coll[name])
+
+activejob = None # the running GESModal operator - one import/export at a time
+
+# Modal runner for the import/export steps - a time slice of work per timer tick with progress on
+# the cursor and in the status bar; Esc cancels and removes the datablocks created so far.
+# Buttons run the operators modal (invoke), scripts calling execute still run them in one go.
+class GESModal:
+    slice = 0.1 # seconds of work per tick
+
+    def run(self, context, steps):
+        global activejob
+        if activejob is not None:
+            self.report({'WARNING'}, "An Earth Studio import/export is already running")
+            return {'CANCELLED'}
+        self.steps = steps
+        self.before = snapshot()
+        self.filepath = bpy.data.filepath
+        self.progress = 0.0
+        self.text = ""
+        try: # first slice right away, in the context of the button
+            if not self.advance():
+                registry.invalidate()
+                return {'FINISHED'}
+        except Exception as e:
+            return self.abort(context, e)
+        activejob = self
+        wm = context.window_manager
+        self.timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        wm.progress_begin(0, 100)
+        return {'RUNNING_MODAL'}
+
+    # run steps for one time slice - False once all work is done
+    def advance(self):
+        t = time.perf_counter()
+        while time.perf_counter() - t < self.slice:
+            try:
+                self.progress, self.text = next(self.steps)
+            except StopIteration:
+                return False
+        return True
+
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.steps.close()
+            rollback(self.before)
+            self.stop(context)
+            self.report({'WARNING'}, "Cancelled - created objects removed")
+            return {'CANCELLED'}
+        if event.type == 'TIMER':
+            try:
+                if not self.advance():
+                    self.stop(context)
+                    return {'FINISHED'}
+            except Exception as e:
+                self.stop(context)
+                return self.abort(context, e)
+            context.window_manager.progress_update(int(self.progress * 100))
+            context.workspace.status_text_set(self.text + " " + format(self.progress * 100, ".0f") + "% - Esc to cancel")
+            return {'RUNNING_MODAL'}
+        if event.type in ('MOUSEMOVE', 'MIDDLEMOUSE', 'WHEELUPMOUSE', 'WHEELDOWNMOUSE', 'TRACKPADPAN', 'TRACKPADZOOM'):
+            return {'PASS_THROUGH'} # the view can still be moved while waiting
+        return {'RUNNING_MODAL'}
+
+    # handler dropped by Blender (File New/Open, window closed) - undo the partial work when it is
+    # still the file the job started in, then release the timer, progress and lock
+    def cancel(self, context):
+        self.steps.close()
+        if bpy.data.filepath == self.filepath and all(self.before[k] <= set(getattr(bpy.data, k).keys()) for k in rollbacktypes):
+            rollback(self.before)
+        self.stop(context)
+
+    def stop(self, context):
+        global activejob
+        activejob = None
+        wm = context.window_manager
+        wm.event_timer_remove(self.timer)
+        wm.progress_end()
+        if context.workspace:
+            context.workspace.status_text_set(None)
+        registry.invalidate()
+
+    def abort(self, context, e):
+        self.steps.close()
+        rollback(self.before)
+        log.exception("Earth Studio import/export failed")
+        self.report({'ERROR'}, str(e))
+        return {'CANCELLED'}
+
+# check files   
+class preobjKML(GESModal, bpy.types.Operator):
+    bl_idname = "scene.pre_objkml"
+    bl_label = "GES PRE KML"
+    
+    action: EnumProperty(items=[('pri','pri','pri'),('sec','sec','sec')])
+        
+    def execute(self, context):
+        if self.action == "pri":
+            objecttokml()
+        
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        if self.action == "pri":
+            return self.run(context, objecttokmlsteps())
+        return {'FINISHED'}
+
+
+# check files   
+class preKML(GESModal, bpy.types.Operator):
+    bl_idname = "scene.pre_kml"
+    bl_label = "GES PRE KML"
+    
+    action: EnumProperty(items=[('pri','pri','pri'),('sec','sec','sec')])
+        
+    def execute(self, context):
+        if self.action == "pri":
+            importkml()
+       
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        if self.action == "pri":
+            return self.run(context, importkmlsteps())
+        return {'FINISHED'}
+
+
+class preGES(GESModal, bpy.types.Operator):
+    bl_idname = "scene.pre_ges"
+    bl_label = "GES PRE GES"
+
+    # update only when there is an import to update - same condition as the panel
+    # (v_update stays saved in the file after _GES_WORLD is deleted)
+    def update(self, context):
+        return bool(bpy.context.scene.GES_OT_Path.v_update and registry.get(context.scene).world)
+    
+    def execute(self, context):
+        fa = bpy.context.scene.GES_OT_Path.p_movie
+        fb  = bpy.context.scene.GES_OT_Path.p_data
+        if fa != '' and fb != '':
+            if self.update(context):
+                updateges()
+            else:
+                importges()
+            registry.invalidate() # new trackpoints for "Snap to"
+ 
+        return {'FINISHED'}
+
+    def invoke(self, context, event):
+        fa = bpy.context.scene.GES_OT_Path.p_movie
+        fb  = bpy.context.scene.GES_OT_Path.p_data
+        if fa != '' and fb != '':
+            return self.run(context, updategessteps() if self.update(context) else importgessteps())
+        return {'FINISHED'}
+
+# check files   
+class preMarker(bpy.types.Operator):
+    bl_idname = "scene.pre_marker"
+    bl_label = "GES PRE MARKER"
+    
+           
+    def execute(self, context):
+        makemarkers()
+        return {'FINISHED'}
+        
+# Info Popup
+def ShowMessageBox(message = "", title = "Information", icon = 'INFO'):
+    if bpy.app.background or not bpy.context.window: # headless (batch) runs report to the console
+        print(title + ": " + message)
+        return
+    def draw(self, context):
+        self.layout.label(text = message)
+    bpy.context.window_manager.popup_menu(draw, title = title, icon = icon)
+
+# start timing an import/export - console output and cache budget follow the Help panel settings
+def startprofile(name):
+    log.setLevel(bpy.context.scene.GES_OT_Path.v_loglevel)
+    cache.resize(bpy.context.scene.GES_OT_Path.v_cachemb << 20)
+    return Profile(name)
+
+# keep the timings for the Help panel, log them and save them next to the .blend if asked
+def endprofile(prof):
+    global lastprofile
+    lastprofile = prof.finish()
+    for line in prof.summary():
+        log.info(line)
+    if bpy.context.scene.GES_OT_Path.v_profile:
+        if bpy.data.filepath:
+            prof.write(os.path.splitext(bpy.data.filepath)[0] + ".ges_profile.json")
+        else:
+            log.warning("Save the .blend file first to write a profile next to it")
+    return prof
+
+# create an arrow empty at the origin without operators (also works in background mode)
+def addempty(name):
+    emp = bpy.data.objects.new(name, None)
+    emp.empty_display_type = 'SINGLE_ARROW'
+    bpy.context.collection.objects.link(emp)
+    return emp
+
+# route object for re-import - the active object when it is a curve under a _GES_PATH parent
+def routetarget():
+    obj = bpy.context.active_object
+    if obj is not None and obj.type == 'CURVE' and obj.parent is not None and obj.parent.name.startswith("_GES_PATH"):
+        return obj
+    return None
+
+# rewrite the splines of an existing route curve in place, one spline per points array in cos;
+# points can only be added to a spline, so a spline that has to shrink is recreated (with the ones
+# after it, to keep their order) - returns the number of splines written, unchanged ones are skipped
+def updateroute(crv, cos, curvetype):
+    splines = crv.splines
+    settings = [(sp.type, sp.order_u, sp.resolution_u, sp.use_endpoint_u, sp.use_cyclic_u, sp.material_index, sp.use_smooth) for sp in splines]
+    keep = min(len(splines), len(cos))
+    keep = next((i for i in range(keep) if len(splines[i].points) > len(cos[i])), keep)
+    for sp in list(splines)[keep:]:
+        splines.remove(sp)
+
+    written = 0
+    for i, co in enumerate(cos):
+        co = co.astype(numpy.float32).ravel()
+        if i < keep:
+            spline = splines[i]
+            n = len(spline.points)
+            if n == len(co) // 4: # same size - compare before writing
+                old = numpy.empty(len(co), dtype=numpy.float32)
+                spline.points.foreach_get("co", old)
+                if numpy.array_equal(old, co):
+                    continue
+            else:
+                spline.points.add(len(co) // 4 - n)
+        else:
+            kind, order, resolution, endpoint, cyclic, material, smooth = settings[i] if i < len(settings) else (curvetype, 12, 6, False, False, 0, True)
+            spline = splines.new(type=kind)
+            spline.points.add(len(co) // 4 - 1)
+            spline.order_u = order
+            spline.resolution_u = resolution
+            spline.use_endpoint_u = endpoint
+            spline.use_cyclic_u = cyclic
+            spline.material_index = material
+            spline.use_smooth = smooth
+        spline.points.foreach_set("co", co)
+        written += 1
+    if written:
+        crv.update_tag()
+    return written
+          
+# align a parent empty (_GES_WORLD or _GES_PATH) perpendicular to a transform (location/rotation as imported)
+def alignworld(ges_parent, tloc, trot):
+    # function for alignment scaling
+    def scale_from_vector(v):
+        mat = Matrix.Identity(4)
+        for i in range(3):
+            mat[i][i] = v[i]
+        return mat   
+
+    trk_matrix = Matrix.Translation(tloc) @ Euler(trot, 'XYZ').to_matrix().to_4x4() @ scale_from_vector((0.1,0.1,0.1))
+    loc_src, rot_src, scale_src = trk_matrix.decompose()
+    loc_dst, rot_dst, scale_dst = Matrix.Identity(4).decompose()
+
+    axis = Vector((0.0, 0.0, 1.0))
+    z1 = rot_src @ axis
+    z2 = rot_dst @ axis
+    q = z2.rotation_difference(z1)
+
+    ges_parent.matrix_world = (
+        Matrix.Translation(loc_dst) @
+        (q @ rot_dst).to_matrix().to_4x4() @
+        scale_from_vector(scale_dst)
+    )
+    
+    # change x,y to negative values of x,y
+    ges_parent.rotation_euler[0] = -ges_parent.rotation_euler[0]
+    ges_parent.rotation_euler[1] = -ges_parent.rotation_euler[1]
+
+# plane mesh shared by every trackpoint - data name must start with "Plan" (see trackitems)
+def trackplane():
+    tmesh = bpy.data.meshes.new("Plane")
+    tmesh.from_pydata([(-1,-1,0), (1,-1,0), (-1,1,0), (1,1,0)], [], [(0,1,3,2)])
+    tmesh.update()
+    return tmesh
+
+# trackpoint transform and GES properties
+def settrackpoint(trk, loc, rot, pos, lat, lng, alt):
+    trk.location = loc
+    trk.rotation_euler = rot
+    trk.scale = (0.1,0.1,0.1)
+    
+    trk['X'] = pos[0]
+    trk['Y'] = pos[1]
+    trk['Z'] = pos[2]
+    trk['LAT'] = lat # real lat - mislabeled
+    trk['LNG'] = lng # real lng - mislabeled
+    trk['ALT'] = alt
+
+# trackpoint name without the import order prefix ("3. Lighthouse" -> "Lighthouse")
+def trackkey(name):
+    idx, sep, rest = name.partition(". ")
+    return rest if sep and idx.isdigit() else name
+
+# the trackpoint _GES_WORLD is aligned to - "1. ..." (first in the export), otherwise the first by name;
+# None without trackpoints
+def firsttrack():
+    world = bpy.context.scene.objects.get("_GES_WORLD")
+    tracks = sorted(obj.name for obj in (world.children if world else ()) if obj.type == "MESH" and obj.data.name[0:4] == "Plan")
+    return next((name for name in tracks if name.startswith("1. ")), tracks[0] if tracks else None)
+
+def importges():
+    runsteps(importgessteps())
+
+def updateges():
+    runsteps(updategessteps())
+
+# Earth Studio import as steps for the modal operator - yields (progress, status) between chunks of work;
+# the existing camera and scene are only changed after the last yield, so a cancelled import
+# is undone by removing the datablocks it created
+def importgessteps(chunk=200):
+    prof = startprofile("importges")
+    scene = bpy.context.scene
+    
+    # load JSON file for evaluation
+    # Sample format: jfilename = "D:/Local/Project/Beach/beach/beach.json"
+    jfilename = bpy.path.abspath(bpy.context.scene.GES_OT_Path.p_data)
+
+    ges = yield from progresssteps(cachedgessteps(jfilename, bpy.context.scene.GES_OT_Path.v_sidecar), 0, 0.5, "Reading Earth Studio JSON")
+    prof.lap("parse", len(ges["cameraPositions"]) + len(ges["trackNames"]), cached=cache.lasthit)
+     # check trackpoints
+    if len(ges["trackNames"]) == 0:
+        ShowMessageBox( "Ensure Earth Studio project has Trackpoints (min 1) and export JSON file with trackpoints.","Import Aborted - No Trackpoints Found","ERROR") 
+    else:
+        
+        # load the GES render files as background for camera
+        # Sample format: ifiles = "D:/Local/Project/Beach/beach/footage/beach_0000.jpeg"
+        ifiles = bpy.path.abspath(bpy.context.scene.GES_OT_Path.p_movie)
+
+        img = bpy.data.movieclips.load(ifiles)
+        prof.lap("footage", 1)
+        yield 0.55, "Loading footage"
+
+        # trackpoint transforms and properties for all trackpoints at once
+        # (positioned relative to the first trackpoint, which sits at the center of Blender global coordinates)
+        trks = gestrackpoints(ges)
+        tposl = ges["trackPositions"].tolist()
+        tlocs = trks["locations"].tolist()
+        trots = trks["rotations"].tolist()
+        tlat = trks["lat"].tolist()
+        tlng = trks["lng"].tolist()
+        talt = trks["alt"].tolist()
+        tcol = bpy.context.collection
+
+        # create parent object - parent used to align position on earth with Blender global coordinates
+        ges_parent = addempty("_GES_WORLD")
+        alignworld(ges_parent, tlocs[0], trots[0])
+
+        # one plane mesh shared by every trackpoint
+        tmesh = trackplane()
+
+        # load trackpoints - created through the data API, parented, then linked
+        for f in range (0,len(tlocs)):
+            trk = bpy.data.objects.new(str(f + 1) + ". " + ges["trackNames"][f], tmesh)
+            settrackpoint(trk, tlocs[f], trots[f], tposl[f], tlat[f], tlng[f], talt[f])
+            
+            # move trackpoint to GES parent
+            trk.parent = ges_parent
+            tcol.objects.link(trk)
+            if f % chunk == chunk - 1:
+                yield 0.55 + 0.35 * (f + 1) / len(tlocs), "Creating trackpoints"
+        prof.lap("trackpoints", len(tlocs))
+
+        # camera frames decoded to keyframe arrays - position set in relation to first trackpoint, scale to 1/100
+        frames, locs, rots = gescamera(ges)
+        lkeep = rkeep = None
+        if bpy.context.scene.GES_OT_Path.v_decimate: # drop keys that linear interpolation reproduces
+            rots, lkeep, rkeep = decimatecamera(frames, locs, rots, bpy.context.scene.GES_OT_Path.v_postol, bpy.context.scene.GES_OT_Path.v_rottol)
+            removed = 3 * (2 * len(frames) - len(lkeep) - len(rkeep))
+            prof.lap("decimate", 6 * len(frames), removed=removed)
+        yield 0.95, "Keyframing camera"
+
+        # from here on no more yields - the camera and scene are changed in one go
+        cam = bpy.context.scene.camera
+        if not cam: # add a camera if deleted
+            
+            cam_d = bpy.data.cameras.new(name='Camera')
+            cam_o = bpy.data.objects.new('Camera', cam_d)
+            bpy.data.collections['Collection'].objects.link(cam_o)
+            cam = cam_o
+            bpy.context.scene.camera = cam
+
+        cam.data.show_background_images = True
+        cam.data.clip_end = 10000
+
+        bg = cam.data.background_images.new()
+        bg.clip = img
+        bg.alpha = 1
+        bg.source = "MOVIE_CLIP"
+
+        # evaluate number of frames
+        s_end = ges["numFrames"]
+
+        # set scene duration
+        scene.frame_start = 1
+        scene.frame_end = s_end 
+        scene.frame_set(1)
+
+        # Camera Information
+        cam.delta_rotation_euler.y = 180 * math.pi / 180
+
+        keyframecamera(cam, frames, locs, rots, lkeep, rkeep)
+        prof.lap("camera", len(frames))
+            
+        # camera "lens" based on 20 degree Filed of View (default value)
+        cam.data.sensor_width = 35 
+        cam.data.type = 'PERSP'
+        cam.data.lens_unit = 'FOV'
+        cam.data.angle = math.radians(34.8)
+
+        # move camera to GES parent
+        cam.parent = ges_parent
+
+        bpy.context.scene.frame_current = 1   
+        if bpy.context.screen: # no screen when running headless
+            area = next((area for area in bpy.context.screen.areas if area.type == 'VIEW_3D'), None)
+            if area:
+                area.spaces[0].region_3d.view_perspective = 'CAMERA'
+        if bpy.context.scene.GES_OT_Path.v_decimate:
+            ShowMessageBox( str(removed) + " of " + str(6 * len(frames)) + " camera keyframes removed") 
+    endprofile(prof)
+
+# Update an earlier Earth Studio import from a re-export - the camera, its background clip, _GES_WORLD
+# and the trackpoints are reused; trackpoints are matched by name (moved, added or removed) and
+# camera keys are only written where the new frames differ from the current F-curves
+def updategessteps():
+    prof = startprofile("updateges")
+    scene = bpy.context.scene
+    ges_parent = scene.objects.get("_GES_WORLD")
+    cam = scene.camera
+    if ges_parent is None or cam is None:
+        ShowMessageBox("Import Earth Studio first - there is no _GES_WORLD and camera to update.", "Update Aborted", "ERROR")
+        endprofile(prof)
+        return
+
+    jfilename = bpy.path.abspath(bpy.context.scene.GES_OT_Path.p_data)
+    ges = yield from progresssteps(cachedgessteps(jfilename, bpy.context.scene.GES_OT_Path.v_sidecar), 0, 0.8, "Reading Earth Studio JSON")
+    prof.lap("parse", len(ges["cameraPositions"]) + len(ges["trackNames"]), cached=cache.lasthit)
+    if len(ges["trackNames"]) == 0:
+        ShowMessageBox( "Ensure Earth Studio project has Trackpoints (min 1) and export JSON file with trackpoints.","Update Aborted - No Trackpoints Found","ERROR") 
+        endprofile(prof)
+        return
+
+    trks = gestrackpoints(ges)
+    tposl = ges["trackPositions"].tolist()
+    tlocs = trks["locations"].tolist()
+    trots = trks["rotations"].tolist()
+    tlat = trks["lat"].tolist()
+    tlng = trks["lng"].tolist()
+    talt = trks["alt"].tolist()
+    frames, locs, rots = gescamera(ges)
+    lkeep = rkeep = None
+    if bpy.context.scene.GES_OT_Path.v_decimate: # drop keys that linear interpolation reproduces
+        rots, lkeep, rkeep = decimatecamera(frames, locs, rots, bpy.context.scene.GES_OT_Path.v_postol, bpy.context.scene.GES_OT_Path.v_rottol)
+    yield 0.9, "Updating"
+
+    # from here on no more yields - existing data is changed in one go
+    # footage - the background clip is kept unless the footage file changed
+    ifiles = os.path.normpath(bpy.path.abspath(bpy.context.scene.GES_OT_Path.p_movie))
+    bg = next((b for b in cam.data.background_images if b.source == "MOVIE_CLIP"), None)
+    if bg is None:
+        bg = cam.data.background_images.new()
+        bg.alpha = 1
+        bg.source = "MOVIE_CLIP"
+    if bg.clip is None or os.path.normpath(bpy.path.abspath(bg.clip.filepath, library=bg.clip.library)) != ifiles:
+        bg.clip = bpy.data.movieclips.load(ifiles, check_existing=True)
+    cam.data.show_background_images = True
+    prof.lap("footage", 1)
+
+    # trackpoints by name (without the order prefix) - first trackpoint may have moved, so realign first
+    alignworld(ges_parent, tlocs[0], trots[0])
+    existing = {}
+    for obj in ges_parent.children:
+        if obj.type == "MESH" and obj.data.name[0:4] == "Plan": #mod for some international languages
+            existing.setdefault(trackkey(obj.name), []).append(obj)
+    tmesh = next((objs[0].data for objs in existing.values()), None)
+    if tmesh is None: # same shared plane as a new import
+        tmesh = trackplane()
+    tcol = ges_parent.users_collection[0] if ges_parent.users_collection else bpy.context.collection
+
+    added = moved = 0
+    names = []
+    for f in range (0,len(tlocs)):
+        found = existing.get(ges["trackNames"][f])
+        if found:
+            trk = found.pop(0)
+            if (trk.location - Vector(tlocs[f])).length > 1e-6 or (Vector(trk.rotation_euler) - Vector(trots[f])).length > 1e-6:
+                moved += 1
+        else:
+            trk = bpy.data.objects.new(str(f + 1) + ". " + ges["trackNames"][f], tmesh)
+            trk.parent = ges_parent
+            tcol.objects.link(trk)
+            added += 1
+        settrackpoint(trk, tlocs[f], trots[f], tposl[f], tlat[f], tlng[f], talt[f])
+        names.append((trk, str(f + 1) + ". " + ges["trackNames"][f]))
+
+    removed = 0
+    for objs in existing.values():
+        for obj in objs:
+            bpy.data.objects.remove(obj)
+            removed += 1
+    # new order prefixes - through a temporary name so a swap doesn't collide (and get a .001 suffix)
+    renamed = [(trk, name) for trk, name in names if trk.name != name]
+    for trk, name in renamed:
+        trk.name = "~" + name
+    for trk, name in renamed:
+        trk.name = name
+    prof.lap("trackpoints", len(tlocs), added=added, moved=moved, removed=removed)
+
+    # camera - only the keys that changed
+    scene.frame_start = 1
+    scene.frame_end = ges["numFrames"]
+    written = keyframecamera(cam, frames, locs, rots, lkeep, rkeep, update=True)
+    ranges = [(int(frames[a]), int(frames[b])) for a, b in maskranges(written)]
+    prof.lap("camera", len(frames), frames=int(numpy.count_nonzero(written)), ranges=len(ranges))
+    endprofile(prof)
+
+    changes = ", ".join(str(a) if a == b else str(a) + "-" + str(b) for a, b in ranges[0:5]) + (", ..." if len(ranges) > 5 else "")
+    ShowMessageBox( "Camera: " + (str(int(numpy.count_nonzero(written))) + " frames updated (" + changes + ")" if ranges else "unchanged")
+        + " - Trackpoints: " + str(added) + " added, " + str(removed) + " removed, " + str(moved) + " moved in " + format(prof.seconds, ".2f") + "s") 
+
+# write camera animation in bulk - one F-curve per location/rotation channel
+# lkeep/rkeep select the location/rotation samples to key (decimated keys interpolate linearly)
+# update=True keeps F-curves that already have keys on the same frames and only writes the changed
+# values (a few keys one by one, otherwise in bulk); returns a mask of the frames that were written
+def keyframecamera(cam, frames, locs, rots, lkeep=None, rkeep=None, update=False):
+    if not cam.animation_data:
+        cam.animation_data_create()
+    act = cam.animation_data.action
+    if not act:
+        act = bpy.data.actions.new(cam.name + "Action")
+        cam.animation_data.action = act
+    
+    written = numpy.zeros(len(frames), dtype=bool)
+    for path, values, keep in (("location", locs, lkeep), ("rotation_euler", rots, rkeep)):
+        linear = keep is not None
+        if keep is None:
+            keep = numpy.arange(len(frames))
+        co = numpy.empty((len(keep), 2), dtype=numpy.float32)
+        co[:, 0] = frames[keep]
+        for i in range(3):
+            co[:, 1] = values[keep, i]
+            fc = act.fcurves.find(path, index=i)
+            if update and fc and len(fc.keyframe_points) == len(keep):
+                old = numpy.empty(2 * len(keep), dtype=numpy.float32)
+                fc.keyframe_points.foreach_get("co", old)
+                old = old.reshape(-1, 2)
+                if numpy.array_equal(old[:, 0], co[:, 0]): # same keys - compare the values
+                    diff = numpy.nonzero(old[:, 1] != co[:, 1])[0]
+                    if len(diff) == 0:
+                        continue
+                    if len(diff) * 16 < len(keep):
+                        kps = fc.keyframe_points
+                        for k, v in zip(diff.tolist(), co[diff, 1].tolist()):
+                            kps[k].co[1] = v
+                    else:
+                        fc.keyframe_points.foreach_set("co", co.ravel())
+                    fc.update() # handles of the moved keys
+                    written[keep[diff]] = True
+                    continue
+            # replace any previous import rather than merging keys into it
+            if fc:
+                act.fcurves.remove(fc)
+            fc = act.fcurves.new(path, index=i, action_group="Object Transforms")
+            fc.keyframe_points.add(len(keep))
+            fc.keyframe_points.foreach_set("co", co.ravel())
+            if linear: # 'LINEAR' - the tolerance holds for straight lines between the kept keys
+                fc.keyframe_points.foreach_set("interpolation", numpy.ones(len(keep), dtype=numpy.int32))
+            fc.update()
+            written[keep] = True
+    return written
+
+def importkml():
+    runsteps(importkmlsteps())
+
+# route import as steps - the route file and the reference JSON are read a part at a time,
+# the route itself is projected and built in one go (see routesplines)
+def importkmlsteps():
+    prof = startprofile("importkml")
+    v_zerotrack = firsttrack() #initial center plane
+    if v_zerotrack is None:
+        ShowMessageBox("There are no trackpoints under _GES_WORLD - import Earth Studio with trackpoints first.", "Import Aborted", "ERROR")
+        endprofile(prof)
+        return
+
+    add_elev = float(bpy.context.scene.GES_OT_Path.v_elevation)
+    sn = bpy.data.objects[bpy.context.scene.GES_OT_Path.v_snapto]
+    
+    tralt = sn["ALT"]
+
+    target = None # existing route to rebuild in place
+    if bpy.context.scene.GES_OT_Path.v_reimport:
+        target = routetarget()
+        if target is None:
+            ShowMessageBox("Select a RoutePath (curve under _GES_PATH) to re-import into.", "Re-import Aborted", "ERROR")
+            endprofile(prof)
+            return
+                    
+
+    # load kml file for evaluation - first route (LineString etc.), otherwise all gx:Track points;
+    # or every route in one pass, grouped as (object name, routes) - one object, or one per Placemark
+    xfilename = bpy.path.abspath(bpy.context.scene.GES_OT_Path.p_kml)
+    mode = bpy.context.scene.GES_OT_Path.v_routes
+    if mode == 'FIRST':
+        route = yield from progresssteps(cachedroutesteps(xfilename), 0, 0.4, "Reading route")
+        groups = [("RoutePath", [route])] if len(route) else []
+    else:
+        found = yield from progresssteps(cachedallroutesteps(xfilename), 0, 0.4, "Reading routes")
+        if mode == 'SPLINES':
+            groups = [("RoutePath", [coords for name, coords in found])] if found else []
+        else: # consecutive routes with the same name come from one Placemark (MultiGeometry)
+            groups = []
+            for name, coords in found:
+                if groups and groups[-1][0] == (name or "RoutePath"):
+                    groups[-1][1].append(coords)
+                else:
+                    groups.append((name or "RoutePath", [coords]))
+    if target is not None and mode == 'OBJECTS': # only the Placemark the route object was named after
+        groups = [g for g in groups if g[0] in (target.name, target.name.rsplit(".", 1)[0])][0:1]
+        if len(groups) == 0:
+            ShowMessageBox("No Placemark named " + target.name + " in " + os.path.basename(xfilename) + ".", "Re-import Aborted", "ERROR")
+            endprofile(prof)
+            return
+    routes = [coords for name, group in groups for coords in group]
+    if len(routes) == 0:
+        log.warning("No route found in %s", xfilename)
+        endprofile(prof)
+        return
+    total = sum(len(coords) for coords in routes)
+    prof.lap("parse", total, cached=cache.lasthit, routes=len(routes))
+   
+    # load JSON file for evaluation
+    # Sample format: jfilename = "D:/Local/Project/Beach/beach/beach.json"
+    trkrel = None
+    tindex = None
+    if str(bpy.context.scene.GES_OT_Path.v_terrain) == 'True':
+        jfilename = bpy.path.abspath(bpy.context.scene.GES_OT_Path.p_refdata)
+        ref = yield from progresssteps(cachedgessteps(jfilename, bpy.context.scene.GES_OT_Path.v_sidecar), 0.4, 0.9, "Reading reference JSON")
+        trkrel = ref["trackRelative"]
+        tindex = cachedindex(jfilename, bpy.context.scene.GES_OT_Path.v_sidecar)
+        prof.lap("reference", len(trkrel), cached=cache.lasthit)
+
+    prox = bpy.context.scene.GES_OT_Path.v_prox /10000 # set altitude base on "closeness" to trackpoint - default 0.001 (0.0001 is closer, 0.01 more forgiving)
+    redval =  bpy.context.scene.GES_OT_Path.v_reduce  # reduce KML points based on closeness - default 10 (1 is closer (less reduction), 100 further away (more reduction))
+    tolerance = None # or simplify the route to within v_tolerance meters
+    if bpy.context.scene.GES_OT_Path.v_reducemode == 'SIMPLIFY':
+        tolerance = bpy.context.scene.GES_OT_Path.v_tolerance
+
+    # set coordinates to splines - every route projected in one batch, relative to the anchor
+    # (start of the first route), scaled 1/100
+    cos = routesplines(routes, add_elev, redval, trkrel, prox, tralt, tindex, prof, tolerance)
+    kept = sum(len(co) - 1 for co in cos)
+
+    if target is not None: # same curve, object, parent and anchor - only the points are rewritten
+        written = updateroute(target.data, cos, bpy.context.scene.GES_OT_Path.v_curve)
+        prof.lap("update", kept, written=written)
+        endprofile(prof)
+        if written:
+            ShowMessageBox( target.name + ": " + str(kept) + " of " + str(total) + " points kept, " + str(written) + " of " + str(len(cos)) + " splines updated in " + format(prof.seconds, ".2f") + "s") 
+        else:
+            ShowMessageBox( target.name + ": route unchanged") 
+        return
+
+    # one curve object per group, a spline per route
+    objs = []
+    c = 0
+    for name, group in groups:
+        crv = bpy.data.curves.new('crv', 'CURVE')
+        crv.dimensions = '3D'
+        for co in cos[c:c + len(group)]:
+            spline = crv.splines.new(type=bpy.context.scene.GES_OT_Path.v_curve)
+            spline.resolution_u = 6
+            spline.order_u = 12
+            spline.points.add(len(co)-1)
+            spline.points.foreach_set("co", co.astype(numpy.float32).ravel())
+        c += len(group)
+        crv.bevel_depth = bpy.context.scene.GES_OT_Path.v_bevel
+        objs.append(bpy.data.objects.new(name, crv))
+    prof.lap("build", kept, objects=len(objs))
+
+    # align path to surface of the globe - all route objects share one _GES_PATH parent
+    log.debug("Aligning route to %s", v_zerotrack)
+    for obj in objs:
+        obj.rotation_euler[1] = bpy.data.objects[v_zerotrack].rotation_euler[1] #math.radians(90-flng)
+        obj.rotation_euler[2] = bpy.data.objects[v_zerotrack].rotation_euler[2] #math.radians(flat)
+        bpy.data.collections['Collection'].objects.link(obj)
+
+    #re-align to global system
+    ges_path = addempty("_GES_PATH") # create empty container
+
+    # path has no parent and sits at the origin - its world matrix is its rotation
+    alignworld(ges_path, (0.0, 0.0, 0.0), objs[0].rotation_euler)
+    
+    # creates anchor object - used to ensure path remains at height
+    ges_start = addempty("Anchor Empty") # create empty container
+    ges_start.parent = ges_path
+    ges_start.parent_type = 'OBJECT'
+   
+        
+    for obj in objs:
+        # reset rotation on obj
+        obj.rotation_euler[1] = math.radians(0)
+        obj.rotation_euler[2] = math.radians(0)
+
+        # add object to parent
+        obj.parent = ges_path
+        obj.parent_type = 'OBJECT'
+   
+    ges_path.location = sn.matrix_world.to_translation()
+    prof.lap("link", len(objs) + 2)
+    endprofile(prof)
+    if len(routes) == 1:
+        ShowMessageBox( "Route: " + str(kept) + " of " + str(total) + " points kept in " + format(prof.seconds, ".2f") + "s") 
+    else:
+        ShowMessageBox( str(len(routes)) + " routes in " + str(len(objs)) + " objects: " + str(kept) + " of " + str(total) + " points kept in " + format(prof.seconds, ".2f") + "s") 
+
+def makemarkers():
+    prof = startprofile("makemarkers")
+    mkrcnt = 0 # Counter for information
+
+    # Load template objects
+    mk = bpy.data.objects[bpy.context.scene.GES_OT_Path.v_mtemplate]
+    instance = bpy.context.scene.GES_OT_Path.v_minstance
+    
+    # Create new collection
+    if "GESMarkers" not in bpy.data.collections:
+        collection = bpy.data.collections.new("GESMarkers")
+        bpy.context.scene.collection.children.link(collection)
+
+    # marker data - shared with the template when instancing, text bodies always unique
+    def markerdata(src):
+        if src.data is None or (instance and src.type != 'FONT'):
+            return src.data
+        return src.data.copy()
+    
+    newobjs = []
+    kids = mk.children
+    
+    # Cycle through GES trackpoints (except hidden ones)
+    objects = bpy.data.objects["_GES_WORLD"].children 
+
+    for obj in objects:
+        if obj.type == "MESH":
+            if  obj.data.name[0:5] == "Plane" and obj.visible_get():
+                # Trackpoint name and clean up
+                newtext = obj.name
+                spx = newtext.split(' ')[0].replace(".","")
+                if spx.isdecimal():
+                    newtext = newtext.replace(spx + ". ","")
+                # Create new empty or marker (copy of / link to template data)
+                mk2 = bpy.data.objects.new('Marker_' + newtext, markerdata(mk))
+                # Set location, scale and rotation for Parent object
+                mk2.location = obj.matrix_world.translation
+                mk2.scale = mk.scale
+                mk2.rotation_euler = mk.rotation_euler
+                
+                # Add track to camera
+                if str(bpy.context.scene.GES_OT_Path.v_mlookat) == "True":
+                    constraint = mk2.constraints.new(type='TRACK_TO')
+                    constraint.target = bpy.data.objects['Camera']
+                    constraint.track_axis="TRACK_Z"
+                newobjs.append(mk2)
+                # Clone children (really, we're doing that)
+                for kid in kids:
+                   
+                    k2 = bpy.data.objects.new( kid.name + '_' + newtext, markerdata(kid))
+                    k2.matrix_local = kid.matrix_local
+                    if k2.type == 'FONT': # if a text object, set the text value to trackpoint name
+                        k2.data.body = newtext
+                    k2.parent = mk2  
+                    newobjs.append(k2)
+             
+                mkrcnt += 1
+
+    prof.lap("build", mkrcnt, objects=len(newobjs))
+
+    # Move (link) to Collection in one batch once the hierarchy is complete
+    mcol = bpy.data.collections["GESMarkers"].objects
+    for mo in newobjs:
+        mcol.link(mo)
+    prof.lap("link", len(newobjs))
+    endprofile(prof)
+    ShowMessageBox( str(mkrcnt) + " Markers Created in " + format(prof.seconds, ".2f") + "s") 
+
+def objecttokml():
+    runsteps(objecttokmlsteps())
+
+# object export as steps - the copy/convert/transform operators run before the first yield (in the
+# context of the button), then the coordinate conversion and a block of faces per step;
+# a cancelled export deletes the partly written file
+def objecttokmlsteps():
+    prof = startprofile("objecttokml")
+
+    wobj = bpy.data.objects['_GES_WORLD']
+    anc = wobj.children[0] #load first trackpoint
+    ancp = wobj
+
+    src_obj = bpy.context.active_object 
+    C = bpy.context
+    
+    # create a copy of object to modify for export
+    obj = src_obj.copy()
+    obj.data = src_obj.data.copy()
+    obj.animation_data_clear()
+    C.collection.objects.link(obj)
+
+    src_obj.select_set(False)
+    obj.select_set(True) #select the text obj
+    bpy.context.view_layer.objects.active = obj
+    bpy.context.view_layer.update()
+    
+    # if object is a curve (a path) then covert the curve to a mesh
+    if obj.parent:
+        if obj.parent.name[0:9] == "_GES_PATH":
+            obj.data.splines[0].resolution_u = 2
+
+            override = bpy.context.copy()
+            bpy.ops.object.convert(override,target='MESH')  
+            bpy.ops.object.parent_clear(type='CLEAR_KEEP_TRANSFORM')
+                       
+    bpy.data.objects[src_obj.name].select_set(False)
+    bpy.data.objects[obj.name].select_set(True)
+
+    bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
+    
+    # apply world transformation (#1) - using 1/100 scale and lat/long euler
+    bpy.ops.transform.resize(value=(.10, .10, .10))
+    obj.rotation_euler[2] = anc.rotation_euler[2]
+    bpy.ops.object.transform_apply(location=False, rotation=True, scale=True)
+  
+    t_location = wobj.matrix_world.inverted() @ obj.location
+    # get object starting location in world space
+    tx = t_location.x 
+    ty = t_location.y 
+    tz = t_location.z 
+
+    bpy.context.view_layer.update()
+    prof.lap("prepare", 1)
+  
+    # create inverted matrix for world and anchor - combined into one 4x4
+    winvert =  wobj.matrix_world.inverted() 
+    ainvert = anc.matrix_world.inverted()
+    tmat = numpy.array(winvert @ ainvert)
+    aoff = (float(anc['X']), float(anc['Y']), float(anc['Z']))
+
+    # read all vertices at once
+    verts = numpy.empty(len(obj.data.vertices) * 3)
+    obj.data.vertices.foreach_get("co", verts)
+    verts = verts.reshape(-1, 3)
+
+    # reverse blender coordinate infomation into lat/long/alt - each shared vertex converted once
+    yield 0.1, "Converting vertices"
+    pn = llastrings(*vertexlla(verts, tmat, (tx, ty, tz), aoff))
+    prof.lap("convert", len(pn))
+    yield 0.3, "Writing KML"
+
+    # face rings as vertex indices into the table
+    lstart = numpy.empty(len(obj.data.polygons), dtype=numpy.int32)
+    ltotal = numpy.empty(len(obj.data.polygons), dtype=numpy.int32)
+    corners = numpy.empty(len(obj.data.loops), dtype=numpy.int32)
+    obj.data.polygons.foreach_get("loop_start", lstart)
+    obj.data.polygons.foreach_get("loop_total", ltotal)
+    obj.data.loops.foreach_get("vertex_index", corners)
+
+    opath = bpy.context.scene.GES_OT_Path
+    ext = ".kmz" if opath.v_objkmz else ".kml"
+    outputPath = bpy.path.abspath(opath.p_objexpfolder + opath.p_objexp + ext)
+
+    # save the file - header first, then polygons streamed out a block of faces at a time
+    try:
+        with openkml(outputPath, opath.v_objkmz) as out:
+            out.write(kmlheader(obj.name, opath.v_objfillcolor, opath.v_objfillopacity, opath.v_objlinecolor, opath.v_objlinewidth))
+            yield from progresssteps(writepolygonsteps(out, pn, lstart.tolist(), ltotal.tolist(), corners.tolist()), 0.3, 1.0, "Writing KML")
+            out.write(kmlfooter)
+    except GeneratorExit: # cancelled - no half written file, selection back on the source object
+        if os.path.exists(outputPath):
+            os.remove(outputPath)
+        src_obj.select_set(True)
+        bpy.context.view_layer.objects.active = src_obj
+        raise
+    prof.lap("write", len(lstart))
+    
+    # remove copied object
+    bpy.ops.object.delete()
+
+    # set focus back to original object
+    bpy.data.objects[src_obj.name].select_set(True)
+    prof.lap("cleanup", 1)
+    endprofile(prof)
+    ShowMessageBox( str(opath.p_objexp) + ext + " saved in " + format(prof.seconds, ".2f") + "s.") 
+    
+def prettyPrint(element, level=0):
+    '''
+    Printing in elementTree requires a little massaging
+    Function taken from elementTree site:
+    http://effbot.org/zone/element-lib.htm#prettyprint
+
+    '''
+    indent = '\n' + level * '  '
+    if len(element):
+        if not element.text or not element.text.strip():
+            element.text = indent + '  '
+
+        if not element.tail or not element.tail.strip():
+            element.tail = indent
+
+        for element in element:
+            prettyPrint(element, level + 1)
+
+        if not element.tail or not element.tail.strip():
+            element.tail = indent
+
+    else:
+        if level and (not element.tail or not element.tail.strip()):
+            element.tail = indent
+
+    return element
+
+    
+def register():
+    bpy.utils.register_class(GES_PT_ImportPanel)
+    bpy.utils.register_class(GES_PT_KMLPanel)
+    bpy.utils.register_class(GES_PT_ObjectKMLPanel)
+    bpy.utils.register_class(GES_PT_MarkerPanel)
+    bpy.utils.register_class(GES_PT_InfoPanel)
+    bpy.utils.register_class(GES_OT_Path)
+    bpy.utils.register_class(preobjKML)
+    bpy.utils.register_class(preKML)
+    bpy.utils.register_class(preGES)
+    bpy.utils.register_class(preMarker)
+    bpy.utils.register_class(isvoid)
+    bpy.utils.register_class(clearcache)
+    
+    bpy.types.Scene.GES_OT_Path = bpy.props.PointerProperty(type=GES_OT_Path)
+    bpy.app.handlers.depsgraph_update_post.append(gesdepsgraph)
+    bpy.app.handlers.load_post.append(gesloadpost)
+    bpy.app.handlers.undo_post.append(gesundo)
+    bpy.app.handlers.redo_post.append(gesundo)
+    gessubscribe()
+    if not log.handlers: # console output for the Help panel log level
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("GES %(levelname)s: %(message)s"))
+        log.addHandler(handler)
+    
+def unregister():
+    bpy.msgbus.clear_by_owner(msgowner)
+    for handlers, fn in ((bpy.app.handlers.depsgraph_update_post, gesdepsgraph), (bpy.app.handlers.load_post, gesloadpost),
+            (bpy.app.handlers.undo_post, gesundo), (bpy.app.handlers.redo_post, gesundo)):
+        if fn in handlers:
+            handlers.remove(fn)
+    bpy.utils.unregister_class(GES_PT_ImportPanel)
+    bpy.utils.unregister_class(GES_PT_KMLPanel)
+    bpy.utils.unregister_class(GES_PT_ObjectKMLPanel)
+    bpy.utils.unregister_class(GES_PT_MarkerPanel)
+    bpy.utils.unregister_class(GES_PT_InfoPanel)
+    bpy.utils.unregister_class(GES_OT_Path)
+    bpy.utils.unregister_class(preobjKML)
+    bpy.utils.unregister_class(preKML)
+    bpy.utils.unregister_class(preGES)
+    bpy.utils.unregister_class(preMarker)
+    bpy.utils.unregister_class(isvoid)
+    bpy.utils.unregister_class(clearcache)
+    
+if __name__ == "__main__":
+    register() 
\ No newline at end of file
@@ -0,0 +1,1075 @@
+#    Copyright (c) 2021 imagiscope
+#    See __init__.py for license terms.
+
+# Earth Studio Tools - core parsing and geo maths
+#
+# Plain Python/NumPy (no bpy or mathutils) so the import/export hot paths can be
+# profiled, benchmarked and tested outside Blender. Arrays in, arrays out - the
+# add-on operators in __init__.py only move the results into Blender data.
+
+import os, sys, json, math, re, io, zipfile, contextlib, time, logging, shutil
+from collections import OrderedDict
+from array import array
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError: # removed in Python 3.9 (Blender 2.93+)
+    from xml.etree import ElementTree
+
+import numpy
+
+earth = 6371010.1 #earth radius, in meters
+
+log = logging.getLogger("ges")
+
+# Wall time and item counts per phase of an import/export run
+#   prof = Profile("importkml")
+#   with prof.phase("parse") as ph:
+#       route = firstroute(filename)
+#       ph["items"] = len(route)
+# or, for straight-line code, prof.lap("parse", len(route)) once the step is done
+class Profile:
+    def __init__(self, name):
+        self.name = name
+        self.phases = []
+        self.start = time.perf_counter()
+        self.mark = self.start
+        self.seconds = 0.0
+
+    @contextlib.contextmanager
+    def phase(self, name, items=0):
+        rec = {"phase": name, "items": items}
+        t = time.perf_counter()
+        try:
+            yield rec
+        finally:
+            self.mark = time.perf_counter()
+            rec["seconds"] = self.mark - t
+            self.phases.append(rec)
+            log.debug("%s %s: %.4fs %s", self.name, name, rec["seconds"], rec["items"])
+
+    # record a phase that ends now and began where the previous one ended
+    def lap(self, name, items=0, **counts):
+        rec = dict(phase=name, items=items, **counts)
+        now = time.perf_counter()
+        rec["seconds"] = now - self.mark
+        self.mark = now
+        self.phases.append(rec)
+        log.debug("%s %s: %.4fs %s", self.name, name, rec["seconds"], items)
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+        return self
+
+    # one line per phase, extra counters (ie. points kept) after the item count
+    def summary(self):
+        lines = [self.name + ": " + format(self.seconds, ".2f") + "s"]
+        for rec in self.phases:
+            extra = "".join(", " + k + " " + str(v) for k, v in rec.items() if k not in ("phase", "items", "seconds"))
+            lines.append("  " + rec["phase"] + ": " + format(rec["seconds"], ".3f") + "s (" + str(rec["items"]) + extra + ")")
+        return lines
+
+    def todict(self):
+        return {"name": self.name, "seconds": self.seconds, "phases": self.phases}
+
+    # add this run to a JSON profile file, one entry per operation (last run wins)
+    def write(self, filename):
+        try:
+            with open(filename, 'r') as pfile:
+                runs = json.load(pfile)
+        except (OSError, ValueError):
+            runs = {}
+        runs[self.name] = dict(self.todict(), date=time.strftime("%Y-%m-%d %H:%M:%S"))
+        with open(filename, 'w') as pfile:
+            json.dump(runs, pfile, indent=2)
+
+# Streaming reader for Earth Studio JSON exports
+# yields (key, value) for top level entries, but one (key, item) per element of
+# "trackPoints" and "cameraFrames" so the full document is never held in memory
+# (progress, when given a dict, gets the number of characters read so far as "read")
+def streamges(filename, chunk=1 << 20, progress=None):
+    return streamjson(filename, ("trackPoints", "cameraFrames"), chunk, progress)
+
+# Streaming reader for a JSON object - (key, value) per top level entry, one (key, item) per
+# element when the value of a key in split is an array
+def streamjson(filename, split, chunk=1 << 20, progress=None):
+    decoder = json.JSONDecoder()
+    space = re.compile(r'[ \t\n\r]*')
+    jfile = open(filename,'r')
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        # read at least as much as is buffered so a large value is not rescanned too often
+        data = jfile.read(max(chunk, len(buf) - pos))
+        if data == "":
+            eof = True
+            return False
+        if progress is not None:
+            progress["read"] = progress.get("read", 0) + len(data)
+        buf = buf[pos:] + data
+        pos = 0
+        return True
+
+    def peek():
+        # skip whitespace and return the next character ("" at end of file)
+        nonlocal pos
+        while True:
+            pos = space.match(buf, pos).end()
+            if pos < len(buf):
+                return buf[pos]
+            if not fill():
+                return ""
+
+    def value():
+        nonlocal pos
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                # a number touching the end of the buffer may be cut short (ie. "12." of "12.5")
+                if eof or (end < len(buf) and (type(obj) not in (int, float) or buf[end] in ",}] \t\r\n")):
+                    pos = end
+                    return obj
+            except ValueError:
+                if eof:
+                    raise
+            fill()
+
+    try:
+        if peek() != "{":
+            raise ValueError(os.path.basename(filename) + " must start with a JSON object")
+        pos += 1
+        while True:
+            c = peek()
+            if c == "}" or c == "":
+                break
+            if c == ",":
+                pos += 1
+                continue
+            key = value()
+            if peek() != ":":
+                raise ValueError("Expected ':' after " + str(key))
+            pos += 1
+            if peek() == "[" and key in split:
+                pos += 1
+                while True:
+                    c = peek()
+                    if c == "]":
+                        pos += 1
+                        break
+                    if c == "":
+                        raise ValueError("Unexpected end of file in " + key)
+                    if c == ",":
+                        pos += 1
+                        continue
+                    yield key, value()
+            else:
+                yield key, value()
+    finally:
+        jfile.close()
+
+# Run a steps generator (yields progress 0..1 between chunks of work) to the end, return its result
+def runsteps(steps):
+    while True:
+        try:
+            next(steps)
+        except StopIteration as e:
+            return e.value
+
+# Sub-steps of a longer job - progress mapped into lo..hi of the whole job, yielded with a status text
+#   ges = yield from progresssteps(loadgessteps(filename), 0, 0.5, "Reading JSON")
+def progresssteps(steps, lo, hi, text):
+    while True:
+        try:
+            f = next(steps)
+        except StopIteration as e:
+            return e.value
+        yield lo + (hi - lo) * f, text
+
+# Decode an Earth Studio export straight into flat numeric arrays
+# trackRelative holds the raw GES relative lat/lng/alt values (0..1)
+def loadges(filename):
+    return runsteps(loadgessteps(filename))
+
+# loadges as steps - progress every `every` frames/trackpoints; with sidecar=True the binary
+# sidecar is used when it is current (and written after decoding the JSON otherwise)
+def loadgessteps(filename, sidecar=False, every=5000):
+    if sidecar:
+        ges = loadsidecar(filename)
+        if ges is not None:
+            return ges
+    size = max(1, os.path.getsize(filename))
+    progress = {}
+    count = 0
+    numframes = 0
+    campos = array('d')
+    camrot = array('d')
+    trkpos = array('d')
+    trkrel = array('d')
+    trknames = []
+    for key, item in streamges(filename, progress=progress):
+        count += 1
+        if count % every == 0:
+            yield min(1.0, progress.get("read", 0) / size)
+        if key == "cameraFrames":
+            campos.extend((item["position"]["x"], item["position"]["y"], item["position"]["z"]))
+            camrot.extend((float(item["rotation"]["x"]), float(item["rotation"]["y"]), float(item["rotation"]["z"])))
+        elif key == "trackPoints":
+            attr = item["coordinate"]["position"]["attributes"]
+            trkpos.extend((item["position"]["x"], item["position"]["y"], item["position"]["z"]))
+            trkrel.extend((attr[0]["value"]["relative"], attr[1]["value"]["relative"], attr[2]["value"]["relative"]))
+            trknames.append(item["name"])
+        elif key == "numFrames":
+            numframes = item
+
+    ges = {
+        "numFrames": numframes,
+        "cameraPositions": numpy.frombuffer(campos, dtype=numpy.float64).reshape(-1, 3),
+        "cameraRotations": numpy.frombuffer(camrot, dtype=numpy.float64).reshape(-1, 3),
+        "trackPositions": numpy.frombuffer(trkpos, dtype=numpy.float64).reshape(-1, 3),
+        "trackRelative": numpy.frombuffer(trkrel, dtype=numpy.float64).reshape(-1, 3),
+        "trackNames": trknames,
+    }
+    if sidecar:
+        try:
+            writesidecar(filename, ges)
+        except OSError as e: # ie. read-only folder - import still works from the JSON
+            log.warning("Could not write %s: %s", sidecarpath(filename), e)
+    return ges
+
+# Binary sidecar for a decoded export - <json>.gescache/ holds one .npy per array and meta.json
+# (names, frame count and the size/mtime of the JSON it was made from); arrays load memory-mapped
+sidecarversion = 1
+sidecararrays = ("cameraPositions", "cameraRotations", "trackPositions", "trackRelative")
+
+def sidecarpath(filename):
+    return filename + ".gescache"
+
+# decoded export from the sidecar, None when there is none or the JSON changed since it was written
+def loadsidecar(filename):
+    folder = sidecarpath(filename)
+    try:
+        with open(os.path.join(folder, "meta.json"), 'r') as mfile:
+            meta = json.load(mfile)
+        st = os.stat(filename)
+        if meta.get("version") != sidecarversion or meta.get("size") != st.st_size or meta.get("mtime") != st.st_mtime_ns:
+            return None
+        ges = {"numFrames": meta["numFrames"], "trackNames": meta["trackNames"]}
+        for key in sidecararrays:
+            try:
+                ges[key] = numpy.load(os.path.join(folder, key + ".npy"), mmap_mode="r")
+            except ValueError: # empty arrays can't be mapped
+                ges[key] = numpy.load(os.path.join(folder, key + ".npy"))
+        return ges
+    except (OSError, ValueError, KeyError):
+        return None
+
+# write (or replace) the sidecar - built in a temporary folder so a reader never sees half of it
+def writesidecar(filename, ges):
+    folder = sidecarpath(filename)
+    st = os.stat(filename)
+    tmp = folder + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    for key in sidecararrays:
+        numpy.save(os.path.join(tmp, key + ".npy"), numpy.ascontiguousarray(ges[key], dtype=numpy.float64))
+    meta = {"version": sidecarversion, "size": st.st_size, "mtime": st.st_mtime_ns,
+        "numFrames": ges["numFrames"], "trackNames": ges["trackNames"]}
+    with open(os.path.join(tmp, "meta.json"), 'w') as mfile:
+        json.dump(meta, mfile)
+    shutil.rmtree(folder, ignore_errors=True)
+    os.replace(tmp, folder)
+
+# loadges through the sidecar - decoded from JSON (and the sidecar written) only when it is missing or stale
+def loadgesfast(filename):
+    return runsteps(loadgessteps(filename, True))
+
+# (lon, lat, alt) tuple from split KML values - altitude is optional
+def tocoord(v):
+    return (float(v[0]), float(v[1]), float(v[2]) if len(v) > 2 and v[2] != "" else 0.0)
+
+# parse KML <coordinates> text ("lon,lat[,alt] lon,lat[,alt] ...") into an (N,3) array
+def parsecoords(text):
+    tokens = (text or "").split()
+    if len(tokens) != 0 and (text.count(",") == 2 * len(tokens)):
+        # all points have an altitude - convert in one step
+        return numpy.array(text.replace(",", " ").split(), dtype=numpy.float64).reshape(-1, 3)
+    return numpy.array([tocoord(tok.split(",")) for tok in tokens if "," in tok], dtype=numpy.float64).reshape(-1, 3)
+
+# route file reader by extension - GPX, GeoJSON, otherwise KML; all yield (kind, name, coords)
+# given a progress dict, the readers also yield None now and then, with the amount of the
+# file read so far in progress["read"] (so a long read can be split into steps)
+def iterroute(filename, progress=None):
+    ext = os.path.splitext(filename)[1].lower()
+    if ext == ".gpx":
+        return itergpx(filename, progress)
+    if ext in (".geojson", ".json"):
+        return itergeojson(filename, progress)
+    return iterkml(filename, progress)
+
+# iterparse a chunk of the file at a time - yields the (event, element) pairs of each chunk,
+# with the bytes read so far in progress["read"], so even one huge element (a long <coordinates>
+# list) is read in steps
+def pullxml(source, progress=None, chunk=1 << 14):
+    parser = ElementTree.XMLPullParser(events=("start", "end"))
+    read = 0
+    while True:
+        data = source.read(chunk)
+        if not data:
+            break
+        parser.feed(data)
+        read += len(data)
+        if progress is not None:
+            progress["read"] = read
+        yield parser.read_events()
+    parser.close()
+    yield parser.read_events()
+
+# Streaming KML reader - yields (kind, placemark name, coords) for every LineString, LinearRing,
+# gx:Track and Point; coords is an (N,3) lon/lat/alt array
+# each element is dropped from the tree once read so memory stays flat
+def iterkml(filename, progress=None):
+    stack = []
+    name = ""
+    track = None
+    with open(filename, 'rb') as source:
+        for events in pullxml(source, progress):
+            for event, elem in events:
+                tag = elem.tag.rsplit('}', 1)[-1] # namespace-aware local name
+                if event == "start":
+                    stack.append(elem)
+                    if tag == "Placemark":
+                        name = ""
+                    elif tag == "Track":
+                        track = array('d')
+                    continue
+                
+                stack.pop()
+                parent = stack[-1] if stack else None
+                ptag = parent.tag.rsplit('}', 1)[-1] if parent is not None else ""
+                if tag == "name" and ptag == "Placemark":
+                    name = (elem.text or "").strip()
+                elif tag == "coordinates":
+                    yield ptag, name, parsecoords(elem.text)
+                elif tag == "coord" and track is not None:
+                    v = (elem.text or "").split() # gx:coord is "lon lat alt"
+                    if len(v) >= 2:
+                        track.extend(tocoord(v))
+                elif tag == "Track" and track is not None:
+                    yield "Track", name, numpy.frombuffer(track, dtype=numpy.float64).reshape(-1, 3)
+                    track = None
+                if parent is not None:
+                    parent.remove(elem)
+            if progress is not None: # a chunk of the file read
+                yield None
+
+# Streaming GPX reader - yields ("Track", track name, coords) per <trkseg> and ("Route", name, coords)
+# per <rte>; coords is an (N,3) lon/lat/ele array (ele 0 when missing), waypoints are skipped
+# each element is dropped from the tree once read so memory stays flat
+def itergpx(filename, progress=None):
+    stack = []
+    name = ""
+    pts = None
+    ele = 0.0
+    with open(filename, 'rb') as source:
+        for events in pullxml(source, progress):
+            for event, elem in events:
+                tag = elem.tag.rsplit('}', 1)[-1]
+                if event == "start":
+                    stack.append(elem)
+                    if tag in ("trk", "rte"):
+                        name = ""
+                    if tag in ("trkseg", "rte"):
+                        pts = array('d')
+                    elif tag in ("trkpt", "rtept"):
+                        ele = 0.0
+                    continue
+
+                stack.pop()
+                parent = stack[-1] if stack else None
+                ptag = parent.tag.rsplit('}', 1)[-1] if parent is not None else ""
+                if tag == "name" and ptag in ("trk", "rte"):
+                    name = (elem.text or "").strip()
+                elif tag == "ele" and (elem.text or "").strip():
+                    ele = float(elem.text)
+                elif tag in ("trkpt", "rtept") and pts is not None:
+                    pts.extend((float(elem.get("lon")), float(elem.get("lat")), ele))
+                elif tag in ("trkseg", "rte") and pts is not None:
+                    yield ("Track" if tag == "trkseg" else "Route"), name, numpy.frombuffer(pts, dtype=numpy.float64).reshape(-1, 3)
+                    pts = None
+                if parent is not None:
+                    parent.remove(elem)
+            if progress is not None:
+                yield None
+
+# Streaming GeoJSON reader - yields (geometry type, feature name, coords) for every LineString and
+# each line of a MultiLineString (also inside GeometryCollections); a FeatureCollection is read one
+# feature at a time, a single Feature or bare geometry as a whole
+def itergeojson(filename, progress=None):
+    top = {}
+    for key, item in streamjson(filename, ("features",), progress=progress):
+        if key == "features":
+            yield from geojsonlines(item.get("geometry"), featurename(item))
+            if progress is not None:
+                yield None
+        else:
+            top[key] = item
+    if top.get("type") == "Feature":
+        yield from geojsonlines(top.get("geometry"), featurename(top))
+    elif top.get("type") != "FeatureCollection":
+        yield from geojsonlines(top, "")
+
+def featurename(feature):
+    props = feature.get("properties") or {}
+    return str(props.get("name") or props.get("title") or feature.get("id") or "")
+
+def geojsonlines(geom, name):
+    if not geom:
+        return
+    kind = geom.get("type")
+    if kind == "GeometryCollection":
+        for g in geom.get("geometries") or []:
+            yield from geojsonlines(g, name)
+        return
+    if kind == "LineString":
+        lines = [geom.get("coordinates") or []]
+    elif kind == "MultiLineString":
+        lines = geom.get("coordinates") or []
+    else:
+        return
+    for line in lines:
+        # [lon, lat] or [lon, lat, alt] positions - anything past the altitude is dropped
+        if all(len(p) == 3 for p in line):
+            yield kind, name, numpy.array(line, dtype=numpy.float64).reshape(-1, 3)
+        else:
+            yield kind, name, numpy.array([tocoord(p) for p in line], dtype=numpy.float64).reshape(-1, 3)
+
+# function to measure distance between two coordinates (works on numpy arrays)
+def measure(lat1, lon1, lat2, lon2):
+    dLat = lat2 * math.pi / 180 - lat1 * math.pi / 180
+    dLon = lon2 * math.pi / 180 - lon1 * math.pi / 180
+    a = numpy.sin(dLat/2) * numpy.sin(dLat/2) + numpy.cos(lat1 * math.pi / 180) * numpy.cos(lat2 * math.pi / 180) * numpy.sin(dLon/2) * numpy.sin(dLon/2)
+    c = 2 * numpy.arctan2(numpy.sqrt(a), numpy.sqrt(1-a))
+    return earth * c
+
+# convert lon/lat/alt arrays to points in 3D space on the globe (meters) - returns (N,3)
+def llatoxyz(lon, lat, alt):
+    phi = (90 - lat) * (math.pi / 180)
+    theta = (lon + 180) * (math.pi / 180)
+    xyz = numpy.empty((len(lon), 3))
+    xyz[:, 0] = -((earth + alt) * numpy.sin(phi) * numpy.cos(theta))
+    xyz[:, 1] = -((earth + alt) * numpy.sin(phi) * numpy.sin(theta))
+    xyz[:, 2] = ((earth + alt) * numpy.cos(phi))
+    return xyz
+
+# reverse earth centered coordinates (meters) into lon/lat/alt arrays - fancy math (thanks google)
+def xyztolla(xoff, yoff, zoff):
+    edia2= earth + .00001 # used for non-spherical calculations - setting to small difference as GES uses globe
+    
+    f = (earth - edia2) / earth
+    e_sq = f * (2 - f)                       
+    eps = e_sq / (1.0 - e_sq)
+    p = numpy.sqrt(xoff * xoff + yoff * yoff)
+    q = numpy.arctan2((zoff * earth), (p * edia2))
+    sin_q = numpy.sin(q)
+    cos_q = numpy.cos(q)
+    sin_q_3 = sin_q * sin_q * sin_q
+    cos_q_3 = cos_q * cos_q * cos_q
+    phi = numpy.arctan2((zoff + eps * edia2 * sin_q_3), (p - e_sq * earth * cos_q_3))
+    lam = numpy.arctan2(yoff, xoff)
+    v = earth / numpy.sqrt(1.0 - e_sq * numpy.sin(phi) * numpy.sin(phi))
+    h   = (p / numpy.cos(phi)) - v
+
+    return numpy.degrees(lam), numpy.degrees(phi), h
+
+# point reduction - keep a point only when it moved more than redval on both x and y
+# since the last kept point (first two points always kept); returns kept indices
+def reducepoints(xyz, redval):
+    if redval == 0:
+        return numpy.arange(len(xyz))
+    keep = []
+    prevx = 0
+    prevy = 0
+    for i, (ox, oy) in enumerate(xyz[:, 0:2].tolist()):
+        if (prevx + redval < ox or prevx - redval > ox) and (prevy + redval < oy or prevy - redval > oy) or i<2:
+            keep.append(i)
+            prevx = ox
+            prevy = oy
+    return numpy.array(keep, dtype=numpy.int64)
+
+# Douglas-Peucker style split of n ordered samples - dist(pts, a, b) gives the squared error of
+# samples pts against the kept neighbours a and b; every open segment is split at its (first) worst
+# sample in one vectorized pass per level until all errors are within tol2; returns kept indices
+def dpkeep(n, tol2, dist):
+    if n < 3:
+        return numpy.arange(n)
+    keep = numpy.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    pts = numpy.arange(1, n - 1) # samples in segments not yet within tolerance
+    while len(pts):
+        k = numpy.nonzero(keep)[0]
+        s = numpy.searchsorted(k, pts)
+        d = dist(pts, k[s - 1], k[s])
+
+        # samples are in order, so each segment is one run
+        start = numpy.concatenate(([0], numpy.nonzero(numpy.diff(s))[0] + 1))
+        run = numpy.repeat(numpy.arange(len(start)), numpy.diff(numpy.append(start, len(pts))))
+        dmax = numpy.maximum.reduceat(d, start)
+        far = dmax > tol2
+        hit = numpy.nonzero((d == dmax[run]) & far[run])[0]
+        keep[pts[hit[numpy.unique(run[hit], return_index=True)[1]]]] = True
+        pts = pts[far[run] & ~keep[pts]]
+    return numpy.nonzero(keep)[0]
+
+# Douglas-Peucker simplification of 3D points (meters) - keeps the fewest points so that no dropped
+# point is further than tol from the kept polyline; both ends always kept; returns kept indices
+def simplifypoints(xyz, tol):
+    if tol <= 0:
+        return numpy.arange(len(xyz))
+    # distance to the segment a-b (to a when a and b coincide)
+    def dist(pts, a, b):
+        p = xyz[pts] - xyz[a]
+        seg = xyz[b] - xyz[a]
+        l2 = numpy.einsum('ij,ij->i', seg, seg)
+        t = numpy.clip(numpy.einsum('ij,ij->i', p, seg) / numpy.where(l2 > 0, l2, 1), 0, 1)
+        p -= t[:, None] * seg
+        return numpy.einsum('ij,ij->i', p, p)
+    return dpkeep(len(xyz), tol * tol, dist)
+
+# keyframes to keep so that linear interpolation by frame reproduces every sample of values (N,k)
+# within tol (euclidean over the k channels); first and last frame always kept
+def decimatecurve(frames, values, tol):
+    if tol <= 0:
+        return numpy.arange(len(frames))
+    frames = numpy.asarray(frames, dtype=numpy.float64)
+    def dist(pts, a, b):
+        t = ((frames[pts] - frames[a]) / (frames[b] - frames[a]))[:, None]
+        e = values[pts] - (values[a] + t * (values[b] - values[a]))
+        return numpy.einsum('ij,ij->i', e, e)
+    return dpkeep(len(frames), tol * tol, dist)
+
+# camera keyframe decimation - postol in meters (locations are 1/100), rottol in degrees;
+# euler channels are unwrapped first so keys never interpolate the long way round a +/-180 jump
+# returns the unwrapped rotations and the kept location and rotation key indices
+def decimatecamera(frames, locs, rots, postol, rottol):
+    rots = numpy.unwrap(rots, axis=0)
+    lkeep = decimatecurve(frames, locs * 100, postol)
+    rkeep = decimatecurve(frames, numpy.degrees(rots), rottol)
+    return rots, lkeep, rkeep
+
+# Spatial index of trackpoints - uniform lat/lng grid, built once per reference JSON
+# query results are trackpoint indices in export order (lowest index first)
+class TrackIndex:
+    def __init__(self, lon, lat, cell=0.01):
+        self.lon = numpy.asarray(lon, dtype=numpy.float64)
+        self.lat = numpy.asarray(lat, dtype=numpy.float64)
+        self.cell = cell
+        self.grid = {}
+        if len(self.lon) == 0:
+            return
+        ix = numpy.floor(self.lon / cell).astype(numpy.int64)
+        iy = numpy.floor(self.lat / cell).astype(numpy.int64)
+        order = numpy.lexsort((numpy.arange(len(ix)), iy, ix))
+        brk = numpy.nonzero((numpy.diff(ix[order]) != 0) | (numpy.diff(iy[order]) != 0))[0] + 1
+        for grp in numpy.split(order, brk):
+            self.grid[(int(ix[grp[0]]), int(iy[grp[0]]))] = grp
+
+    def __len__(self):
+        return len(self.lon)
+
+    @property
+    def nbytes(self):
+        return self.lon.nbytes + self.lat.nbytes + sum(g.nbytes + 100 for g in self.grid.values())
+
+    # all trackpoints in cells overlapping a lon/lat window (unfiltered)
+    def candidates(self, lon0, lon1, lat0, lat1):
+        x0, x1 = math.floor(lon0 / self.cell), math.floor(lon1 / self.cell)
+        y0, y1 = math.floor(lat0 / self.cell), math.floor(lat1 / self.cell)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.grid):
+            found = [g for (x, y), g in self.grid.items() if x0 <= x <= x1 and y0 <= y <= y1]
+        else:
+            found = [self.grid[(x, y)] for x in range(x0, x1 + 1) for y in range(y0, y1 + 1) if (x, y) in self.grid]
+        if not found:
+            return numpy.zeros(0, dtype=numpy.int64)
+        return numpy.sort(numpy.concatenate(found))
+
+    # trackpoints strictly inside a +/- w degree box (same test as the KML Match Proximity)
+    def box(self, lon, lat, w):
+        c = self.candidates(lon - w, lon + w, lat - w, lat + w)
+        return c[(numpy.abs(self.lon[c] - lon) < w) & (numpy.abs(self.lat[c] - lat) < w)]
+
+    # trackpoints within a great-circle radius in meters, nearest first
+    def radius(self, lon, lat, meters):
+        dlat = math.degrees(meters / earth)
+        maxlat = abs(lat) + dlat
+        dlon = 180.0 if maxlat >= 90 else min(180.0, dlat / math.cos(math.radians(maxlat)))
+        c = self.candidates(lon - dlon, lon + dlon, lat - dlat, lat + dlat)
+        # windows crossing the antimeridian also look on the other side
+        if lon - dlon < -180:
+            c = numpy.union1d(c, self.candidates(lon - dlon + 360, 180, lat - dlat, lat + dlat))
+        if lon + dlon > 180:
+            c = numpy.union1d(c, self.candidates(-180, lon + dlon - 360, lat - dlat, lat + dlat))
+        d = measure(lat, lon, self.lat[c], self.lon[c])
+        keep = d <= meters
+        c, d = c[keep], d[keep]
+        order = numpy.argsort(d, kind='stable')
+        return c[order], d[order]
+
+    # nearest trackpoint (index, distance in meters) - (-1, inf) if the index is empty
+    def nearest(self, lon, lat):
+        if len(self.lon) == 0:
+            return -1, math.inf
+        k = 0
+        c = self.candidates(lon, lon, lat, lat)
+        while len(c) == 0:
+            k += 1
+            w = k * self.cell
+            c = self.candidates(lon - w, lon + w, lat - w, lat + w)
+        # closest of the first ring found bounds the search radius
+        d = measure(lat, lon, self.lat[c], self.lon[c])
+        c, d = self.radius(lon, lat, float(d.min()))
+        if len(c) == 0:
+            return -1, math.inf
+        return int(c[0]), float(d[0])
+
+    # first trackpoint inside the +/- w box of each point (-1 if none), for arrays of points
+    def matchbox(self, lon, lat, w):
+        match = numpy.full(len(lon), -1, dtype=numpy.int64)
+        if len(self.lon) == 0 or len(lon) == 0:
+            return match
+        qx = numpy.floor(lon / self.cell).astype(numpy.int64)
+        qy = numpy.floor(lat / self.cell).astype(numpy.int64)
+        order = numpy.lexsort((qy, qx))
+        brk = numpy.nonzero((numpy.diff(qx[order]) != 0) | (numpy.diff(qy[order]) != 0))[0] + 1
+        for grp in numpy.split(order, brk):
+            # every point of the group lies in one cell, so one candidate list serves all of them
+            x, y = qx[grp[0]] * self.cell, qy[grp[0]] * self.cell
+            c = self.candidates(x - w, x + self.cell + w, y - w, y + self.cell + w)
+            if len(c) == 0:
+                continue
+            inside = (numpy.abs(self.lon[c] - lon[grp, None]) < w) & (numpy.abs(self.lat[c] - lat[grp, None]) < w)
+            match[grp] = numpy.where(inside.any(axis=1), c[inside.argmax(axis=1)], -1)
+        return match
+
+# Terrain follow - altitude for each route point (lon/lat arrays, start point first)
+# trkrel is the GES relative lat/lng/alt of the reference trackpoints, prox the match box in degrees
+# starts - indices where another route (with its own start point) begins, several routes in one call
+def terrainfollow(lon, lat, trkrel, prox, add_elev, index=None, prof=None, starts=None):
+    n = len(lon)
+    starts = numpy.zeros(1, dtype=numpy.int64) if starts is None else numpy.asarray(starts, dtype=numpy.int64)
+    tlon = 360 * trkrel[:, 0] - 180
+    tlat = (89.9999*2) * trkrel[:, 1] - 89.9999
+    talt = 65117481 * trkrel[:, 2] + 1 # base elevation
+
+    if prof is None:
+        prof = Profile("terrainfollow")
+
+    # first trackpoint (in export order) inside the proximity box of each point, -1 if none
+    with prof.phase("match", n) as ph:
+        if index is None:
+            index = TrackIndex(tlon, tlat)
+        match = index.matchbox(lon, lat, prox)
+        ph["matched"] = int(numpy.count_nonzero(match >= 0))
+
+    with prof.phase("interpolate", n):
+        alt = numpy.zeros(n)
+        # start points use their match (or the last trackpoint) lowered by the added elevation
+        alt[starts] = talt[match[starts]] - add_elev
+        isstart = numpy.zeros(n, dtype=bool)
+        isstart[starts] = True
+        # matched points become anchors at trackpoint altitude
+        anc = numpy.nonzero((match >= 0) & ~isstart)[0]
+        alt[anc] = talt[match[anc]]
+
+        # points between anchors climb/descend by distance from previous anchor vs. distance to next trackpoint
+        # (previous anchor or start point and next anchor of the same route)
+        rest = numpy.nonzero((match < 0) & ~isstart)[0]
+        seg = numpy.searchsorted(anc, rest)
+        known = numpy.union1d(starts, anc)
+        prev = known[numpy.searchsorted(known, rest) - 1]
+        route = numpy.searchsorted(starts, rest, side='right')
+        inner = seg < len(anc)
+        inner[inner] = numpy.searchsorted(starts, anc[seg[inner]], side='right') == route[inner]
+        d, a = rest[inner], prev[inner]
+        b = match[anc[seg[inner]]]
+        # lng/lat passed in the same order as the original per-point loop so results are unchanged
+        d1 = measure(lon[a], lat[a], lon[d], lat[d]) # distance between last alt and this
+        d2 = measure(lon[d], lat[d], tlon[b], tlat[b]) # distance between trackpoint alt and this
+        total = d1 + d2
+        dratio = numpy.divide(d1, total, out=numpy.zeros_like(d1), where=total != 0)
+        alt[d] = alt[a] + (talt[b] - alt[a]) * dratio
+
+        # points after the last anchor keep its altitude
+        alt[rest[~inner]] = alt[prev[~inner]]
+    return alt
+
+# In-session cache of parsed inputs - decoded GES arrays, KML routes, trackpoint indexes
+# entries are keyed by (kind, absolute path, size, mtime) so an edited file is parsed again;
+# least recently used entries are dropped once the cached arrays exceed budget bytes (0 disables)
+class ParseCache:
+    def __init__(self, budget=256 << 20):
+        self.budget = budget
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lasthit = False
+
+    # cached loader(filename) - arrays in cached values are read-only
+    def get(self, kind, filename, loader):
+        value = self.lookup(kind, filename)
+        if value is None:
+            value = self.store(kind, filename, loader(filename))
+        return value
+
+    def key(self, kind, filename):
+        filename = os.path.abspath(filename)
+        st = os.stat(filename)
+        return (kind, filename, st.st_size, st.st_mtime_ns)
+
+    # cached value for the file as it is now, None on a miss
+    def lookup(self, kind, filename):
+        key = self.key(kind, filename)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.lasthit = True
+            return self.entries[key][0]
+
+        self.misses += 1
+        self.lasthit = False
+        # an older version of the same file is no longer needed
+        for old in [k for k in self.entries if k[0:2] == key[0:2]]:
+            self.drop(old)
+        return None
+
+    # keep a freshly loaded value (if it fits the budget) and return it
+    def store(self, kind, filename, value):
+        key = self.key(kind, filename)
+        size = datasize(value)
+        if size > self.budget:
+            return value
+        freeze(value)
+        self.entries[key] = (value, size)
+        self.bytes += size
+        while self.bytes > self.budget:
+            self.drop(next(iter(self.entries)))
+            self.evictions += 1
+        return value
+
+    def drop(self, key):
+        self.bytes -= self.entries.pop(key)[1]
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def resize(self, budget):
+        self.budget = budget
+        while self.bytes > self.budget:
+            self.drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def stats(self):
+        return {"entries": len(self.entries), "bytes": self.bytes, "budget": self.budget,
+            "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+# approximate memory held by a decoded input (arrays, names, indexes)
+def datasize(value):
+    if hasattr(value, "nbytes"):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(datasize(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(datasize(v) for v in value) + 8 * len(value)
+    return sys.getsizeof(value)
+
+# mark cached arrays read-only so a caller can't change them for the next user
+def freeze(value):
+    if isinstance(value, numpy.ndarray):
+        value.flags.writeable = False
+    elif isinstance(value, dict):
+        for v in value.values():
+            freeze(v)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            freeze(v)
+
+cache = ParseCache()
+
+# cached versions of the loaders used by the add-on - sidecar=True reads/writes the binary sidecar
+def cachedges(filename, sidecar=False):
+    return runsteps(cachedgessteps(filename, sidecar))
+
+def cachedgessteps(filename, sidecar=False):
+    ges = cache.lookup("ges", filename)
+    if ges is None:
+        ges = cache.store("ges", filename, (yield from loadgessteps(filename, sidecar)))
+    return ges
+
+def cachedroute(filename):
+    return runsteps(cachedroutesteps(filename))
+
+def cachedroutesteps(filename):
+    route = cache.lookup("route", filename)
+    if route is None:
+        route = cache.store("route", filename, (yield from firstroutesteps(filename)))
+    return route
+
+def cachedroutes(filename):
+    return runsteps(cachedallroutesteps(filename))
+
+def cachedallroutesteps(filename):
+    routes = cache.lookup("routes", filename)
+    if routes is None:
+        routes = cache.store("routes", filename, (yield from allroutesteps(filename)))
+    return routes
+
+# trackpoint index of a reference JSON - built from the (cached) decoded trackpoints
+def cachedindex(filename, sidecar=False):
+    def build(filename):
+        trkrel = cachedges(filename, sidecar)["trackRelative"]
+        return TrackIndex(360 * trkrel[:, 0] - 180, (89.9999*2) * trkrel[:, 1] - 89.9999)
+    return cache.get("index", filename, build)
+
+# open a KML export for streaming - buffered .kml, or doc.kml inside a .kmz archive
+@contextlib.contextmanager
+def openkml(path, kmz=False):
+    if kmz:
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            with zf.open("doc.kml", 'w') as entry:
+                with io.TextIOWrapper(entry, encoding='utf-8') as out:
+                    yield out
+    else:
+        with open(path, 'w', encoding='utf-8', buffering=1 << 20) as out:
+            yield out
+
+def rgb_to_hex(color):
+
+    strip_n_pad = lambda stp: str(stp[2:]).zfill(2) 
+    zcol = "".join([strip_n_pad(hex(int(col * 255))) for col in color])
+    rcol = zcol[4:6] + zcol[2:4] + zcol[0:2] # earth format
+   
+    return rcol
+
+# Earth Studio trackpoints - relative lat/lng/alt decoded, placement relative to the first trackpoint
+# (LAT/LNG keep the add-on naming: "lng" is 360 * relative[0] - 180, "lat" from relative[1])
+def gestrackpoints(ges):
+    tpos = ges["trackPositions"]
+    trel = ges["trackRelative"]
+    lng = 360 * trel[:, 0] - 180
+    lat = (89.9999*2) * trel[:, 1] - 89.9999
+    rots = numpy.zeros((len(tpos), 3))
+    rots[:, 1] = numpy.radians(90 - lat)
+    rots[:, 2] = numpy.radians(lng)
+    return {
+        "locations": (tpos - tpos[0]) / 100, # scale to 1/100
+        "rotations": rots,
+        "lng": lng,
+        "lat": lat,
+        "alt": 65117481 * trel[:, 2] + 1,
+    }
+
+# GES camera rotations (degrees) to Blender XYZ eulers (radians) - same as
+# Euler().rotate_axis('X', -rx), rotate_axis('Y', ry), rotate_axis('Z', -rz + 180)
+def gesrotations(rot):
+    n = len(rot)
+    a = numpy.radians(-rot[:, 0])
+    b = numpy.radians(rot[:, 1])
+    c = numpy.radians(-rot[:, 2] + 180)
+    rx = numpy.zeros((n, 3, 3))
+    ry = numpy.zeros((n, 3, 3))
+    rz = numpy.zeros((n, 3, 3))
+    rx[:, 0, 0] = 1
+    rx[:, 1, 1] = rx[:, 2, 2] = numpy.cos(a)
+    rx[:, 2, 1] = numpy.sin(a)
+    rx[:, 1, 2] = -rx[:, 2, 1]
+    ry[:, 1, 1] = 1
+    ry[:, 0, 0] = ry[:, 2, 2] = numpy.cos(b)
+    ry[:, 0, 2] = numpy.sin(b)
+    ry[:, 2, 0] = -ry[:, 0, 2]
+    rz[:, 2, 2] = 1
+    rz[:, 0, 0] = rz[:, 1, 1] = numpy.cos(c)
+    rz[:, 1, 0] = numpy.sin(c)
+    rz[:, 0, 1] = -rz[:, 1, 0]
+    # each rotate_axis turns in local space, so the matrices multiply left to right
+    m = rx @ ry @ rz
+
+    # matrix to euler - of the two solutions keep the one with the smallest angles (as Blender does)
+    cy = numpy.hypot(m[:, 0, 0], m[:, 1, 0])
+    e1 = numpy.stack((numpy.arctan2(m[:, 2, 1], m[:, 2, 2]), numpy.arctan2(-m[:, 2, 0], cy), numpy.arctan2(m[:, 1, 0], m[:, 0, 0])), axis=1)
+    e2 = numpy.stack((numpy.arctan2(-m[:, 2, 1], -m[:, 2, 2]), numpy.arctan2(-m[:, 2, 0], -cy), numpy.arctan2(-m[:, 1, 0], -m[:, 0, 0])), axis=1)
+    lock = cy <= 16 * numpy.finfo(numpy.float32).eps # gimbal lock
+    e1[lock, 0] = numpy.arctan2(-m[lock, 1, 2], m[lock, 1, 1])
+    e1[lock, 2] = 0
+    e2[lock] = e1[lock]
+    pick = numpy.abs(e1).sum(axis=1) > numpy.abs(e2).sum(axis=1)
+    return numpy.where(pick[:, None], e2, e1)
+
+# camera keyframes from a decoded export - frame numbers (from 1), locations relative to the
+# first trackpoint scaled 1/100, and euler rotations; numFrames + 1 samples like the GES export
+def gescamera(ges):
+    n = min(ges["numFrames"] + 1, len(ges["cameraPositions"]))
+    locs = (ges["cameraPositions"][0:n] - ges["trackPositions"][0]) / 100
+    return numpy.arange(1, n + 1), locs, gesrotations(ges["cameraRotations"][0:n])
+
+# (first, last) index pairs of the runs of True in a boolean mask
+def maskranges(mask):
+    d = numpy.diff(numpy.concatenate(([0], numpy.asarray(mask, dtype=numpy.int8), [0])))
+    return list(zip(numpy.nonzero(d == 1)[0].tolist(), (numpy.nonzero(d == -1)[0] - 1).tolist()))
+
+# route used by the KML import - first non-Point <coordinates> (LineString etc.),
+# otherwise every gx:Track point joined; (N,3) lon/lat/alt, empty if there is none
+# (GPX: the first <rte>, otherwise every track segment joined; GeoJSON: the first line)
+def firstroute(filename):
+    return runsteps(firstroutesteps(filename))
+
+# firstroute as steps - progress by the part of the file read
+def firstroutesteps(filename):
+    size = max(1, os.path.getsize(filename))
+    progress = {}
+    track = []
+    for rec in iterroute(filename, progress):
+        if rec is None:
+            yield min(1.0, progress.get("read", 0) / size)
+            continue
+        kind, name, coords = rec
+        if kind == "Track":
+            track.append(coords)
+        elif kind != "Point" and len(coords) != 0:
+            return coords
+    return numpy.concatenate(track) if track else numpy.zeros((0, 3))
+
+# every route in the file in one pass - (placemark name, (N,3) lon/lat/alt) for each LineString,
+# LinearRing and gx:Track with points, in file order (a MultiGeometry gives several with one name;
+# GPX track segments and GeoJSON MultiLineStrings likewise)
+def allroutes(filename):
+    return runsteps(allroutesteps(filename))
+
+def allroutesteps(filename):
+    size = max(1, os.path.getsize(filename))
+    progress = {}
+    routes = []
+    for rec in iterroute(filename, progress):
+        if rec is None:
+            yield min(1.0, progress.get("read", 0) / size)
+        elif rec[0] != "Point" and len(rec[2]) != 0:
+            routes.append((rec[1], rec[2]))
+    return routes
+
+# KML route to spline points - (N,4) relative to the anchor (start point), scaled 1/100
+# with terrain follow when trkrel (GES relative trackpoint values) is given, otherwise the
+# anchor takes the snap-to trackpoint altitude tralt; add_elev lifts the route, redval reduces points
+# (or, with a tolerance in meters, Douglas-Peucker simplification - the anchor is always kept)
+def routespline(route, add_elev, redval, trkrel=None, prox=0.001, tralt=0.0, index=None, prof=None, tolerance=None):
+    return routesplines([route], add_elev, redval, trkrel, prox, tralt, index, prof, tolerance)[0]
+
+# several routes projected in one batch - one spline point array per route, all relative to the
+# start of the first route (the shared anchor); each route is terrain followed and reduced on its own
+def routesplines(routes, add_elev, redval, trkrel=None, prox=0.001, tralt=0.0, index=None, prof=None, tolerance=None):
+    if prof is None:
+        prof = Profile("routespline")
+    # each route with its start point inserted twice (anchor), plus a placeholder end coordinate
+    sizes = numpy.array([len(route) + 1 for route in routes], dtype=numpy.int64)
+    starts = numpy.cumsum(sizes) - sizes
+    pt = numpy.zeros((sizes.sum() + 1, 3))
+    for s, route in zip(starts.tolist(), routes):
+        pt[s] = route[0]
+        pt[s + 1:s + 1 + len(route)] = route
+    if trkrel is None or len(trkrel) == 0: # replace anchor value with trackpoint alt (also when the reference has no trackpoints)
+        pt[starts, 2] = tralt - add_elev
+    else:
+        # calculate altitude based on track points, incline/decline from A to B
+        pt[:, 2] = terrainfollow(pt[:, 0], pt[:, 1], trkrel, prox, add_elev, index, prof, starts)
+
+    # convert lat/lon to points in 3D space on globe (placeholder dropped), then reduce each route
+    with prof.phase("reduce", len(pt) - 1) as ph:
+        xyz = llatoxyz(pt[:-1, 0], pt[:-1, 1], pt[:-1, 2])
+        kept = []
+        for s, n in zip(starts.tolist(), sizes.tolist()):
+            rxyz = xyz[s:s + n]
+            if tolerance is None:
+                kept.append(rxyz[reducepoints(rxyz, redval)])
+            else:
+                kept.append(rxyz[numpy.concatenate(([0], simplifypoints(rxyz[1:], tolerance) + 1))])
+        ph["kept"] = sum(len(k) for k in kept)
+
+    # relative to the anchor - route anchors are dropped (points shift down one slot, last point doubled)
+    cos = []
+    for k in kept:
+        co = numpy.ones((len(k), 4))
+        co[:-1, 0:3] = (k[1:] - xyz[0]) / 100
+        co[-1, 0:3] = co[-2, 0:3]
+        cos.append(co)
+    return cos
+
+# mesh vertices (Blender local coordinates) to lon/lat/alt - tmat is the combined world and
+# anchor inverse (4x4), offset the object start location, aoff the anchor X/Y/Z in meters
+def vertexlla(verts, tmat, offset, aoff):
+    t_vertex = verts @ tmat[0:3, 0:3].T + tmat[0:3, 3]
+    ecef = (t_vertex + offset) * 100 + aoff
+    return xyztolla(ecef[:, 0], ecef[:, 1], ecef[:, 2])
+
+# "lon,lat,alt" strings for KML <coordinates>
+def llastrings(lon, lat, alt):
+    return [str(x) + "," + str(y) + "," + str(z) for x, y, z in zip(lon.tolist(), lat.tolist(), alt.tolist())]
+
+# KML document header with the export style
+def kmlheader(name, fillcolor, fillopacity, linecolor, linewidth):
+    fn = []
+    fn.append ("<?xml version='1.0' encoding='UTF-8'?><kml xmlns='http://www.opengis.net/kml/2.2'>")
+    fn.append ("<Document>")
+    fn.append ("<name>Exported from Blender</name>")
+    fn.append ('<Style id="xstyle">')
+    fn.append ("<PolyStyle>")
+    fopacity = "00"
+    if fillopacity != 0:
+        v = int(fillopacity * 255 / 100)
+        fopacity = hex(v)[2:]
+    
+    fcolor = str(rgb_to_hex (fillcolor))
+    
+    fn.append ("<color>" + fopacity + fcolor +"</color>")
+    ol = "1"
+    if str(linewidth) == "0":
+        ol = "0"
+    fn.append ("<outline>" + ol +"</outline>")
+    fn.append ("<fill>1</fill>")
+    fn.append ("</PolyStyle>")
+    fn.append ("<LineStyle>")
+
+    lncolor = str(rgb_to_hex (linecolor))
+
+    fn.append ("<color>FF" + lncolor +"</color>")
+    fn.append ("<width>" + str(linewidth) +"</width>")
+    fn.append ("</LineStyle>")
+    fn.append ("</Style>")
+    fn.append ("<Placemark><name>" + str(name) + "</name><visibility>1</visibility>")
+    fn.append("<styleUrl>#xstyle</styleUrl>") 
+    fn.append ("<MultiGeometry>")
+    return " ".join(fn) + " "
+
+kmlfooter = "</MultiGeometry></Placemark></Document></kml> "
+
+# write one <Polygon> per face, a block of faces at a time - pn is the per-vertex coordinate
+# table, faces are given by loop start/total into corners (vertex indices)
+def writepolygons(out, pn, lstart, ltotal, corners, step=10000):
+    runsteps(writepolygonsteps(out, pn, lstart, ltotal, corners, step))
+
+# writepolygons as steps - progress after each block of faces
+def writepolygonsteps(out, pn, lstart, ltotal, corners, step=10000):
+    for b in range(0, len(lstart), step):
+        # write point parameters (lat/long/alt) for each face - ring closed with its first point
+        fn = []
+        for c, n in zip(lstart[b:b + step], ltotal[b:b + step]):
+            fn.append ("<Polygon><extrude>0</extrude><altitudeMode>absolute</altitudeMode>")
+            fn.append ("<outerBoundaryIs><LinearRing><coordinates>")
+            fn.extend ([pn[v] for v in corners[c:c + n]])
+            if n != 0:
+                fn.append (pn[corners[c]])
+            fn.append ("</coordinates></LinearRing></outerBoundaryIs>")
+            fn.append ("</Polygon>")
+        out.write(" ".join(fn) + " ")
+        yield min(1.0, (b + step) / len(lstart))
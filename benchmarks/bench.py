@@ -0,0 +1,186 @@
+#    Copyright (c) 2021 imagiscope
+#    See GES_Panel_1_2/__init__.py for license terms.
+
+# Earth Studio Tools - benchmarks
+#
+# Times the import/export hot paths on generated inputs (see generators.py) and records
+# the best/median time and peak traced memory of each phase as JSON:
+#
+#   python benchmarks/bench.py --sizes small,medium --out before.json
+#   python benchmarks/bench.py --sizes small,medium --out after.json --compare before.json
+#
+# Run inside Blender to include the phases that write Blender data (curve points, camera keyframes):
+#
+#   blender -b --factory-startup --python benchmarks/bench.py -- --sizes medium --out blender.json
+
+import os, sys, json, time, argparse, platform, tempfile, tracemalloc
+
+import numpy
+
+here = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(here)) # the add-on package (Blender phases)
+sys.path.insert(0, os.path.join(os.path.dirname(here), "GES_Panel_1_2")) # ges_core on its own, without bpy
+sys.path.insert(0, here)
+from ges_core import (loadges, loadsidecar, writesidecar, firstroute, terrainfollow, llatoxyz, reducepoints, simplifypoints, routespline,
+    gescamera, decimatecamera, vertexlla, llastrings, openkml, kmlheader, kmlfooter, writepolygons)
+import generators
+
+try:
+    import bpy
+except ImportError:
+    bpy = None
+
+# camera frames, trackpoints, route points, mesh faces
+SIZES = {
+    "small": {"frames": 300, "tracks": 20, "points": 1000, "faces": 1000},
+    "medium": {"frames": 3000, "tracks": 200, "points": 10000, "faces": 10000},
+    "large": {"frames": 30000, "tracks": 2000, "points": 100000, "faces": 100000},
+}
+
+# generate the inputs for one size into folder
+def makeinputs(folder, size, seed):
+    n = SIZES[size]
+    inputs = {"json": generators.writeges(os.path.join(folder, size + ".json"), n["frames"], n["tracks"], seed, n["points"])}
+    pts = generators.route(n["points"], seed)
+    for variant in generators.KMLVARIANTS:
+        inputs[variant] = generators.writekml(os.path.join(folder, size + "_" + variant + ".kml"), pts, variant)
+    inputs["gpx"] = generators.writegpx(os.path.join(folder, size + ".gpx"), pts)
+    inputs["geojson"] = generators.writegeojson(os.path.join(folder, size + ".geojson"), pts)
+    inputs["mesh"] = generators.mesh(n["faces"], seed)
+    inputs["export"] = os.path.join(folder, size + "_export.kml")
+    return inputs
+
+# phases as (name, items, function) - inputs already decoded so each phase is measured on its own
+def phases(inputs, size):
+    n = SIZES[size]
+    ges = loadges(inputs["json"])
+    route = firstroute(inputs["coordinates"])
+    trkrel = ges["trackRelative"]
+    verts, lstart, ltotal, corners = inputs["mesh"]
+    aoff = tuple(llatoxyz(route[0:1, 0], route[0:1, 1], route[0:1, 2])[0])
+    tmat = numpy.identity(4)
+
+    def kmlexport():
+        pn = llastrings(*vertexlla(verts, tmat, (0, 0, 0), aoff))
+        with openkml(inputs["export"]) as out:
+            out.write(kmlheader("Mesh", (1, 0.5, 0), 50, (1, 1, 1), 1))
+            writepolygons(out, pn, lstart.tolist(), ltotal.tolist(), corners.tolist())
+            out.write(kmlfooter)
+
+    writesidecar(inputs["json"], ges)
+    steps = [
+        ("parse_ges", n["frames"] + n["tracks"], lambda: loadges(inputs["json"])),
+        ("parse_ges_sidecar", n["frames"] + n["tracks"], lambda: loadsidecar(inputs["json"])),
+    ]
+    for variant in generators.KMLVARIANTS:
+        steps.append(("parse_kml_" + variant, n["points"], lambda v=variant: firstroute(inputs[v])))
+    steps.append(("parse_gpx", n["points"], lambda: firstroute(inputs["gpx"])))
+    steps.append(("parse_geojson", n["points"], lambda: firstroute(inputs["geojson"])))
+    steps += [
+        ("terrain_follow", n["points"], lambda: terrainfollow(route[:, 0], route[:, 1], trkrel, 0.001, 0)),
+        ("point_reduction", n["points"], lambda: reducepoints(llatoxyz(route[:, 0], route[:, 1], route[:, 2]), 2)),
+        ("point_simplify", n["points"], lambda: simplifypoints(llatoxyz(route[:, 0], route[:, 1], route[:, 2]), 1.0)),
+        ("spline_build", n["points"], lambda: routespline(route, 0, 2, trkrel, 0.001)),
+        ("camera_keyframes", n["frames"], lambda: gescamera(ges)),
+        ("camera_decimate", n["frames"], lambda: decimatecamera(*gescamera(ges), 0.05, 0.01)),
+        ("kml_export", n["faces"], kmlexport),
+    ]
+    if bpy is not None:
+        steps += blenderphases(ges, route, trkrel, n)
+    return steps
+
+# phases that also move the results into Blender data - curve spline points and camera F-curves
+def blenderphases(ges, route, trkrel, n):
+    import GES_Panel_1_2
+
+    def splinewrite():
+        crv = bpy.data.curves.new('crv', 'CURVE')
+        crv.dimensions = '3D'
+        spline = crv.splines.new(type='NURBS')
+        co = routespline(route, 0, 2, trkrel, 0.001)
+        spline.points.add(len(co)-1)
+        spline.points.foreach_set("co", co.astype(numpy.float32).ravel())
+        bpy.data.curves.remove(crv)
+
+    def camerakeys():
+        cam = bpy.data.objects.new("Camera", bpy.data.cameras.new("Camera"))
+        GES_Panel_1_2.keyframecamera(cam, *gescamera(ges))
+        act = cam.animation_data.action
+        cam_data = cam.data
+        bpy.data.objects.remove(cam)
+        bpy.data.cameras.remove(cam_data)
+        bpy.data.actions.remove(act)
+
+    return [("spline_build_blender", n["points"], splinewrite), ("camera_keyframes_blender", n["frames"], camerakeys)]
+
+# best and median time over repeat runs, then one traced run for peak memory
+def measure(fn, repeat):
+    times = []
+    for i in range(repeat):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times.sort()
+    return {"best": times[0], "median": times[len(times) // 2], "peak_bytes": peak}
+
+def run(sizes, repeat, seed, keep=None):
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = keep or tmp
+            os.makedirs(folder, exist_ok=True)
+            inputs = makeinputs(folder, size, seed)
+            for name, items, fn in phases(inputs, size):
+                r = {"size": size, "phase": name, "items": items}
+                r.update(measure(fn, repeat))
+                results.append(r)
+                print("{:8} {:26} {:>8} items {:10.4f}s best {:10.4f}s median {:10.1f} MB peak".format(
+                    size, name, items, r["best"], r["median"], r["peak_bytes"] / 1e6), flush=True)
+    return results
+
+# best time of each phase against an earlier results file
+def compare(results, filename):
+    with open(filename, 'r') as rfile:
+        base = {(r["size"], r["phase"]): r for r in json.load(rfile)["results"]}
+    print("\ncompared with " + filename)
+    for r in results:
+        b = base.get((r["size"], r["phase"]))
+        if b:
+            print("{:8} {:26} {:10.4f}s -> {:10.4f}s  x{:.2f}".format(r["size"], r["phase"], b["best"], r["best"], b["best"] / max(r["best"], 1e-12)))
+
+def main(argv):
+    # Blender passes script arguments after "--"
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = argv[1:]
+    parser = argparse.ArgumentParser(prog="bench", description="Earth Studio Tools benchmarks")
+    parser.add_argument("--sizes", default="small,medium", help="comma separated: " + ", ".join(SIZES))
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per phase")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed")
+    parser.add_argument("--out", default="bench.json", help="results file")
+    parser.add_argument("--compare", help="earlier results file to compare with")
+    parser.add_argument("--keep", help="folder to keep the generated inputs in")
+    args = parser.parse_args(argv)
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    for s in sizes:
+        if s not in SIZES:
+            parser.error("unknown size " + s)
+    results = run(sizes, max(1, args.repeat), args.seed, args.keep)
+
+    meta = {"date": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(), "numpy": numpy.__version__,
+        "platform": platform.platform(), "blender": bpy.app.version_string if bpy is not None else None,
+        "repeat": args.repeat, "seed": args.seed, "sizes": {s: SIZES[s] for s in sizes}}
+    with open(args.out, 'w') as rfile:
+        json.dump({"meta": meta, "results": results}, rfile, indent=2)
+    print("results written to " + args.out)
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,142 @@
+#    Copyright (c) 2021 imagiscope
+#    See GES_Panel_1_2/__init__.py for license terms.
+
+# Earth Studio Tools - synthetic inputs for the benchmarks
+#
+# Deterministic (seeded) generators for each input the add-on reads:
+#   route()     - a walking route as (N,3) lon/lat/alt
+#   writeges()  - Earth Studio JSON export (camera frames + trackpoints, relative layout)
+#   writekml()  - KML route as Google Earth <coordinates>, gx:Track <gx:coord> or My Maps export
+#   writegpx()  - GPX track (<trkpt> with <ele>) as written by GPS loggers
+#   writegeojson() - GeoJSON FeatureCollection with the route as a LineString feature
+#   mesh()      - quad grid mesh as vertex/loop arrays (as read with foreach_get)
+# The same size and seed always give the same file, so timings can be compared between runs.
+
+import os, sys, json, math
+
+import numpy
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "GES_Panel_1_2"))
+from ges_core import llatoxyz
+
+start = (-122.4194, 37.7749) # lon, lat of the first route point
+KMLVARIANTS = ("coordinates", "gx", "mymaps")
+
+# random walk of n points, 5-15 m apart, slowly turning and climbing/descending
+def route(n, seed=0):
+    rs = numpy.random.RandomState(seed)
+    heading = numpy.cumsum(rs.normal(0, 0.15, n))
+    step = rs.uniform(5, 15, n) # meters
+    step[0] = 0
+    lat = start[1] + numpy.cumsum(step * numpy.cos(heading)) / 111320
+    lon = start[0] + numpy.cumsum(step * numpy.sin(heading)) / (111320 * math.cos(math.radians(start[1])))
+    alt = 20 + numpy.abs(numpy.cumsum(rs.normal(0, 0.5, n)))
+    return numpy.stack((lon, lat, alt), axis=1)
+
+# Earth Studio JSON - trackpoints sampled along the route, camera orbiting above it
+def writeges(path, frames, tracks, seed=0, points=None):
+    pts = route(points or max(frames, tracks), seed)
+    rs = numpy.random.RandomState(seed + 1)
+
+    # trackpoints - GES relative values are the inverse of the scaling used on import
+    ti = numpy.linspace(0, len(pts) - 1, tracks).astype(int)
+    tpos = llatoxyz(pts[ti, 0], pts[ti, 1], pts[ti, 2])
+    trel = numpy.stack(((pts[ti, 0] + 180) / 360, (pts[ti, 1] + 89.9999) / (89.9999*2), (pts[ti, 2] - 1) / 65117481), axis=1)
+    trackpoints = []
+    for i in range(tracks):
+        trackpoints.append({
+            "name": str(i + 1) + ". Point " + str(i + 1),
+            "position": {"x": tpos[i, 0], "y": tpos[i, 1], "z": tpos[i, 2]},
+            "coordinate": {"position": {"attributes": [
+                {"type": "longitude", "value": {"relative": trel[i, 0]}},
+                {"type": "latitude", "value": {"relative": trel[i, 1]}},
+                {"type": "altitude", "value": {"relative": trel[i, 2]}}]}},
+            "visible": True})
+
+    # camera - numFrames + 1 frames following the route 300 m up
+    ci = numpy.linspace(0, len(pts) - 1, frames + 1)
+    clon = numpy.interp(ci, numpy.arange(len(pts)), pts[:, 0])
+    clat = numpy.interp(ci, numpy.arange(len(pts)), pts[:, 1])
+    calt = numpy.interp(ci, numpy.arange(len(pts)), pts[:, 2]) + 300
+    cpos = llatoxyz(clon, clat, calt)
+    crot = numpy.stack((70 + rs.normal(0, 2, frames + 1), rs.normal(0, 1, frames + 1), numpy.linspace(0, 720, frames + 1)), axis=1)
+    cameraframes = []
+    for i in range(frames + 1):
+        cameraframes.append({
+            "position": {"x": cpos[i, 0], "y": cpos[i, 1], "z": cpos[i, 2]},
+            "rotation": {"x": crot[i, 0], "y": crot[i, 1], "z": crot[i, 2]},
+            "coordinate": {"latitude": clat[i], "longitude": clon[i], "altitude": calt[i]}})
+
+    with open(path, 'w') as jfile:
+        json.dump({"frameRate": 30, "numFrames": frames, "durationSeconds": frames / 30,
+            "cameraFrames": cameraframes, "trackPoints": trackpoints}, jfile, indent=2)
+    return path
+
+# KML route in one of the KMLVARIANTS layouts, written in blocks of points
+def writekml(path, pts, variant="coordinates", step=10000):
+    with open(path, 'w', encoding='utf-8') as kfile:
+        kfile.write("<?xml version='1.0' encoding='UTF-8'?>\n"
+            "<kml xmlns='http://www.opengis.net/kml/2.2' xmlns:gx='http://www.google.com/kml/ext/2.2'>\n<Document>\n")
+        if variant == "coordinates": # Google Earth "Save Place As"
+            kfile.write("<name>Route.kml</name>\n<Placemark>\n<name>Route</name>\n<LineString>\n<tessellate>1</tessellate>\n<coordinates>\n")
+            for b in range(0, len(pts), step):
+                kfile.write(" ".join("{:.7f},{:.7f},{:.2f}".format(*p) for p in pts[b:b + step].tolist()) + " ")
+            kfile.write("\n</coordinates>\n</LineString>\n</Placemark>\n")
+        elif variant == "gx": # GPS logger tracks
+            kfile.write("<name>Track.kml</name>\n<Placemark>\n<name>Track</name>\n<gx:Track>\n")
+            for b in range(0, len(pts), step):
+                kfile.write("".join("<when>2021-01-01T00:{:02d}:{:02d}Z</when>\n".format(i // 60 % 60, i % 60)
+                    for i in range(b, min(b + step, len(pts)))))
+            for b in range(0, len(pts), step):
+                kfile.write("".join("<gx:coord>{:.7f} {:.7f} {:.2f}</gx:coord>\n".format(*p) for p in pts[b:b + step].tolist()))
+            kfile.write("</gx:Track>\n</Placemark>\n")
+        elif variant == "mymaps": # Google My Maps export - start marker first, one point per line, no altitude
+            kfile.write("<name>Route</name>\n<Style id='line-1267FF-5000-nodesc-normal'><LineStyle><color>ffff6712</color><width>5</width></LineStyle></Style>\n"
+                "<Folder>\n<name>Directions</name>\n<Placemark>\n<name>Start</name>\n<Point>\n<coordinates>\n"
+                "            {:.7f},{:.7f},0\n          </coordinates>\n</Point>\n</Placemark>\n".format(*pts[0].tolist())
+                + "<Placemark>\n<name>Directions</name>\n<styleUrl>#line-1267FF-5000-nodesc-normal</styleUrl>\n<LineString>\n<tessellate>1</tessellate>\n<coordinates>\n")
+            for b in range(0, len(pts), step):
+                kfile.write("".join("            {:.7f},{:.7f},0\n".format(*p) for p in pts[b:b + step, 0:2].tolist()))
+            kfile.write("          </coordinates>\n</LineString>\n</Placemark>\n</Folder>\n")
+        else:
+            raise ValueError("Unknown KML variant " + variant)
+        kfile.write("</Document>\n</kml>\n")
+    return path
+
+# GPX 1.1 track - one <trkpt> per line, split into segments of segment points
+def writegpx(path, pts, step=10000, segment=None):
+    segment = segment or len(pts)
+    with open(path, 'w', encoding='utf-8') as gfile:
+        gfile.write("<?xml version='1.0' encoding='UTF-8'?>\n<gpx version='1.1' creator='bench' xmlns='http://www.topografix.com/GPX/1/1'>\n"
+            "<trk>\n<name>Track</name>\n")
+        for s in range(0, len(pts), segment):
+            gfile.write("<trkseg>\n")
+            for b in range(s, min(s + segment, len(pts)), step):
+                gfile.write("".join("<trkpt lat='{1:.7f}' lon='{0:.7f}'><ele>{2:.2f}</ele><time>2021-01-01T00:00:00Z</time></trkpt>\n".format(*p)
+                    for p in pts[b:min(b + step, s + segment)].tolist()))
+            gfile.write("</trkseg>\n")
+        gfile.write("</trk>\n</gpx>\n")
+    return path
+
+# GeoJSON FeatureCollection with the route as one LineString feature (and a start Point feature)
+def writegeojson(path, pts):
+    with open(path, 'w', encoding='utf-8') as gfile:
+        json.dump({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "properties": {"name": "Start"}, "geometry": {"type": "Point", "coordinates": pts[0].tolist()}},
+            {"type": "Feature", "properties": {"name": "Route"}, "geometry": {"type": "LineString", "coordinates": numpy.round(pts, 7).tolist()}}]}, gfile)
+    return path
+
+# quad grid of about the given number of faces, 10 m cells with some height noise (Blender units, 1/100)
+# returns vertex coordinates (N,3) and loop_start, loop_total, vertex_index arrays
+def mesh(faces, seed=0):
+    rs = numpy.random.RandomState(seed)
+    nx = max(1, int(math.ceil(math.sqrt(faces))))
+    ny = max(1, int(math.ceil(faces / nx)))
+    gx, gy = numpy.meshgrid(numpy.arange(nx + 1), numpy.arange(ny + 1))
+    verts = numpy.stack((gx.ravel() * 0.1, gy.ravel() * 0.1, rs.uniform(0, 0.05, gx.size)), axis=1)
+    i, j = numpy.meshgrid(numpy.arange(nx), numpy.arange(ny))
+    v0 = (j * (nx + 1) + i).ravel()[0:faces]
+    corners = numpy.stack((v0, v0 + 1, v0 + nx + 2, v0 + nx + 1), axis=1).ravel()
+    ltotal = numpy.full(len(v0), 4)
+    lstart = numpy.arange(len(v0)) * 4
+    return verts, lstart, ltotal, corners
@@ -0,0 +1,202 @@
+#    Copyright (c) 2021 imagiscope
+#    See GES_Panel_1_2/__init__.py for license terms.
+
+# Earth Studio Tools - headless batch import
+#
+# Runs the "Earth Studio Import" and "Import KML Route" steps without the UI
+# and saves one .blend per job, spreading jobs over several Blender processes.
+#
+#   blender -b --python ges_batch.py -- manifest.json [--jobs 4] [--timeout 3600] [--report summary.json]
+#
+# (plain "python ges_batch.py ... --blender /path/to/blender" works as well)
+#
+# manifest.json - a list of jobs, or {"jobs": [...]}; paths are relative to the manifest:
+#   [
+#     {"data": "beach/beach.json", "movie": "beach/footage/beach_0000.jpeg",
+#      "output": "out/beach.blend",
+#      "kml": "routes/walk.kml", "refdata": "beach/beach.json", "snapto": "1. Start",
+#      "curve": "NURBS", "bevel": 0.0, "elevation": 0, "reduce": 2, "prox": 1, "sidecar": true}
+#   ]
+# only "data" and "movie" are required - "output" defaults to the JSON name with .blend,
+# a route is imported when "kml" is given (.kml, .gpx or .geojson) (terrain follow when "refdata" is given),
+# "sidecar" (or --sidecar for every job) reads/writes the binary .gescache next to each JSON,
+# "tolerance" (meters) simplifies the route with Douglas-Peucker instead of "reduce",
+# "postol" (meters) / "rottol" (degrees) decimate the camera keyframes,
+# "routes" imports every route of the KML: "SPLINES" (one curve) or "OBJECTS" (one per Placemark)
+
+import sys, os, json, time, argparse, subprocess, shutil
+from concurrent.futures import ThreadPoolExecutor
+
+here = os.path.dirname(os.path.abspath(__file__))
+RESULT = "GES_BATCH_RESULT "
+
+# paths in the manifest are relative to the manifest itself
+def loadmanifest(filename):
+    with open(filename, 'r') as mfile:
+        manifest = json.load(mfile)
+    jobs = manifest["jobs"] if isinstance(manifest, dict) else manifest
+    base = os.path.dirname(os.path.abspath(filename))
+    for job in jobs:
+        for key in ("data", "movie", "output", "kml", "refdata"):
+            if job.get(key):
+                job[key] = os.path.normpath(os.path.join(base, job[key]))
+        if not job.get("output"):
+            job["output"] = os.path.splitext(job["data"])[0] + ".blend"
+    return jobs
+
+# worker side - runs inside a background Blender for a single job
+def runjob(job):
+    import bpy
+    sys.path.insert(0, here) # the add-on package next to this script
+    import GES_Panel_1_2 as ges
+
+    timing = {}
+    profiles = [] # per-phase timings recorded by the add-on
+    try:
+        ges.register()
+    except ValueError: # already registered (add-on enabled in this Blender)
+        pass
+    props = bpy.context.scene.GES_OT_Path
+    props.v_sidecar = bool(job.get("sidecar", False))
+    factory = set(bpy.data.objects.keys()) # startup scene objects (Cube, Light, Camera)
+
+    t = time.perf_counter()
+    props.p_data = job["data"]
+    props.p_movie = job["movie"]
+    if job.get("postol") is not None or job.get("rottol") is not None: # camera keyframe decimation
+        props.v_decimate = True
+        props.v_postol = job.get("postol", props.v_postol)
+        props.v_rottol = job.get("rottol", props.v_rottol)
+    ges.importges()
+    timing["importges"] = time.perf_counter() - t
+    profiles.append(ges.lastprofile.todict())
+    if "_GES_WORLD" not in bpy.data.objects:
+        raise RuntimeError("No trackpoints found in " + job["data"])
+
+    if job.get("kml"):
+        t = time.perf_counter()
+        props.p_kml = job["kml"]
+        props.v_terrain = bool(job.get("refdata"))
+        if job.get("refdata"):
+            props.p_refdata = job["refdata"]
+        props.v_snapto = job.get("snapto") or ges.GES_OT_Path.trackitems(props, bpy.context)[0][0]
+        props.v_curve = job.get("curve", props.v_curve)
+        props.v_routes = job.get("routes", props.v_routes)
+        props.v_bevel = job.get("bevel", props.v_bevel)
+        props.v_elevation = job.get("elevation", props.v_elevation)
+        props.v_reduce = job.get("reduce", props.v_reduce)
+        if job.get("tolerance") is not None: # Douglas-Peucker instead of clustering
+            props.v_reducemode = 'SIMPLIFY'
+            props.v_tolerance = job["tolerance"]
+        props.v_prox = job.get("prox", props.v_prox)
+        before = set(bpy.data.objects.keys())
+        ges.importkml()
+        # a failed route import only prints a message in background mode - no new _GES_PATH means nothing was imported
+        if not any(name.startswith("_GES_PATH") for name in set(bpy.data.objects.keys()) - before):
+            raise RuntimeError("No route imported from " + job["kml"])
+        timing["importkml"] = time.perf_counter() - t
+        profiles.append(ges.lastprofile.todict())
+
+    # drop the startup objects the job didn't use - the import reuses the camera, the rest (Cube, Light)
+    # would end up in every output file; their data is unused then and not saved
+    for name in factory:
+        obj = bpy.data.objects.get(name)
+        if obj is not None and obj != bpy.context.scene.camera:
+            bpy.data.objects.remove(obj)
+
+    t = time.perf_counter()
+    os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+    bpy.ops.wm.save_as_mainfile(filepath=job["output"])
+    timing["save"] = time.perf_counter() - t
+    return timing, profiles
+
+def worker(args):
+    job = json.loads(args.worker)
+    try:
+        timing, profiles = runjob(job)
+        result = {"ok": True, "timing": timing, "profiles": profiles}
+    except Exception as e:
+        result = {"ok": False, "error": repr(e)}
+    print(RESULT + json.dumps(result), flush=True)
+
+# controller side - one Blender process per job, at most --jobs at a time
+def launch(blender, job, timeout):
+    cmd = [blender, "-b", "--factory-startup", "--python", os.path.abspath(__file__), "--", "--worker", json.dumps(job)]
+    start = time.perf_counter()
+    report = {"data": job["data"], "output": job["output"], "ok": False}
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=timeout,
+            universal_newlines=True)
+        for line in proc.stdout.splitlines():
+            if line.startswith(RESULT):
+                report.update(json.loads(line[len(RESULT):]))
+        if "timing" not in report and "error" not in report:
+            report["error"] = "Blender exited with code " + str(proc.returncode)
+            report["log"] = proc.stdout[-2000:]
+    except subprocess.TimeoutExpired:
+        report["error"] = "Timed out after " + str(timeout) + "s"
+    report["seconds"] = time.perf_counter() - start
+    return report
+
+def findblender(path):
+    if path:
+        return path
+    try:
+        import bpy
+        return bpy.app.binary_path
+    except ImportError:
+        return shutil.which("blender")
+
+def controller(args):
+    blender = findblender(args.blender)
+    if not blender:
+        sys.exit("Blender executable not found - pass --blender")
+    jobs = loadmanifest(args.manifest)
+    if args.sidecar:
+        for job in jobs:
+            job.setdefault("sidecar", True)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        reports = list(pool.map(lambda job: launch(blender, job, args.timeout), jobs))
+    total = time.perf_counter() - start
+
+    # summary report
+    for r in reports:
+        phases = ", ".join(k + " " + format(v, ".2f") + "s" for k, v in r.get("timing", {}).items())
+        status = "ok" if r["ok"] else "FAILED (" + r.get("error", "") + ")"
+        print(format(r["seconds"], "8.2f") + "s  " + os.path.basename(r["output"]) + "  " + status + ("  [" + phases + "]" if phases else ""))
+    done = sum(1 for r in reports if r["ok"])
+    print(str(done) + "/" + str(len(reports)) + " jobs completed in " + format(total, ".2f") + "s with " + str(args.jobs) + " workers")
+
+    if args.report:
+        with open(args.report, 'w') as rfile:
+            json.dump({"jobs": reports, "seconds": total, "workers": args.jobs}, rfile, indent=2)
+    if done != len(reports):
+        sys.exit(1)
+
+def main(argv):
+    # Blender passes script arguments after "--"
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1:]
+    else:
+        argv = argv[1:]
+    parser = argparse.ArgumentParser(prog="ges_batch", description="Headless Earth Studio batch import")
+    parser.add_argument("manifest", nargs="?", help="JSON manifest of import jobs")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Blender processes to run at once")
+    parser.add_argument("--timeout", type=float, default=None, help="seconds before a job is abandoned")
+    parser.add_argument("--report", help="write the summary report as JSON")
+    parser.add_argument("--sidecar", action="store_true", help="use binary .gescache sidecars for all jobs")
+    parser.add_argument("--blender", help="Blender executable (default: the running Blender, or blender on PATH)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        worker(args)
+    elif args.manifest:
+        controller(args)
+    else:
+        parser.error("a manifest is required")
+
+if __name__ == "__main__":
+    main(sys.argv)